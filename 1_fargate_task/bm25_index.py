@@ -0,0 +1,286 @@
+import re
+import math
+import heapq
+import struct
+import argparse
+
+MAGIC = b'BM25'
+FORMAT_VERSION = 1
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+def tokenize(text):
+    """Lowercase word tokens of at least two characters."""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if len(token) > 1]
+
+def encode_varint(value, out):
+    """Append an unsigned LEB128 varint to the bytearray out."""
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def decode_varint(data, pos):
+    """Read an unsigned LEB128 varint; returns (value, next position)."""
+    result = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+def _encode_string(value, out):
+    raw = value.encode('utf-8')
+    encode_varint(len(raw), out)
+    out.extend(raw)
+
+def _decode_string(data, pos):
+    length, pos = decode_varint(data, pos)
+    return bytes(data[pos:pos + length]).decode('utf-8'), pos + length
+
+def encode_postings(postings):
+    """Encode sorted (doc_id, tf) pairs as delta doc ids and term frequencies."""
+    out = bytearray()
+    previous = 0
+    for doc_id, tf in postings:
+        encode_varint(doc_id - previous, out)
+        encode_varint(tf, out)
+        previous = doc_id
+    return bytes(out)
+
+def decode_postings(data, pos, df):
+    """Decode df (doc_id, tf) pairs starting at pos."""
+    doc_id = 0
+    for _ in range(df):
+        delta, pos = decode_varint(data, pos)
+        tf, pos = decode_varint(data, pos)
+        doc_id += delta
+        yield doc_id, tf
+
+class BM25IndexBuilder:
+    """
+    Accumulates an inverted index shard while articles stream past.
+    """
+    def __init__(self):
+        self.urls = []
+        self.doc_lengths = []
+        self.postings = {}
+
+    def __len__(self):
+        return len(self.urls)
+
+    def add_document(self, url, text):
+        """
+        Tokenize text and add it as a new document.
+
+        Returns:
+            int: shard-local document id
+        """
+        doc_id = len(self.urls)
+        tokens = tokenize(text)
+        counts = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for term, tf in counts.items():
+            self.postings.setdefault(term, []).append((doc_id, tf))
+        self.urls.append(url)
+        self.doc_lengths.append(len(tokens))
+        return doc_id
+
+    def serialize(self):
+        """
+        Shard layout: magic, version, documents (length norm and url), then
+        terms in sorted order, each with its document frequency and postings.
+        """
+        out = bytearray(MAGIC)
+        out.extend(struct.pack('<H', FORMAT_VERSION))
+        encode_varint(len(self.urls), out)
+        for url, length in zip(self.urls, self.doc_lengths):
+            encode_varint(length, out)
+            _encode_string(url, out)
+        encode_varint(len(self.postings), out)
+        for term in sorted(self.postings):
+            postings = self.postings[term]
+            encoded = encode_postings(postings)
+            _encode_string(term, out)
+            encode_varint(len(postings), out)
+            encode_varint(len(encoded), out)
+            out.extend(encoded)
+        return bytes(out)
+
+class BM25Index:
+    """
+    Read-only view of a serialized shard. Postings stay encoded in the shard
+    bytes and are decoded per query term.
+    """
+    def __init__(self, data):
+        if data[:4] != MAGIC:
+            raise ValueError("Not a BM25 index shard")
+        version, = struct.unpack_from('<H', data, 4)
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported BM25 index version: {version}")
+        self.data = data
+        pos = 6
+        num_docs, pos = decode_varint(data, pos)
+        self.urls = []
+        self.doc_lengths = []
+        for _ in range(num_docs):
+            length, pos = decode_varint(data, pos)
+            url, pos = _decode_string(data, pos)
+            self.doc_lengths.append(length)
+            self.urls.append(url)
+        self.avg_doc_length = sum(self.doc_lengths) / num_docs if num_docs else 0.0
+        num_terms, pos = decode_varint(data, pos)
+        # term -> (df, offset of postings)
+        self.terms = {}
+        for _ in range(num_terms):
+            term, pos = _decode_string(data, pos)
+            df, pos = decode_varint(data, pos)
+            size, pos = decode_varint(data, pos)
+            self.terms[term] = (df, pos)
+            pos += size
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls(f.read())
+
+    def __len__(self):
+        return len(self.urls)
+
+    def postings(self, term):
+        if term not in self.terms:
+            return iter(())
+        df, pos = self.terms[term]
+        return decode_postings(self.data, pos, df)
+
+    def scores(self, query, k1=1.2, b=0.75):
+        """
+        BM25 score of every document matching at least one query term.
+
+        Returns:
+            dict: url -> score
+        """
+        num_docs = len(self.urls)
+        scores = {}
+        for term in set(tokenize(query)):
+            if term not in self.terms:
+                continue
+            df = self.terms[term][0]
+            idf = math.log(1.0 + (num_docs - df + 0.5) / (df + 0.5))
+            for doc_id, tf in self.postings(term):
+                norm = k1 * (1.0 - b + b * self.doc_lengths[doc_id] / self.avg_doc_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (k1 + 1.0) / (tf + norm)
+        return {self.urls[doc_id]: score for doc_id, score in scores.items()}
+
+    def search(self, query, k=10, k1=1.2, b=0.75):
+        """
+        Returns:
+            list: (url, score) pairs, best first
+        """
+        return heapq.nlargest(k, self.scores(query, k1, b).items(), key=lambda item: item[1])
+
+def merge_shards(shards):
+    """
+    Merge shards (from different WARC files or Fargate tasks) into one.
+    Documents are renumbered in shard order; a url already seen in an
+    earlier shard is dropped.
+
+    Args:
+        shards (list): BM25Index objects
+
+    Returns:
+        bytes: serialized merged shard
+    """
+    merged = BM25IndexBuilder()
+    seen = set()
+    # Per shard: local doc id -> merged doc id (None when dropped)
+    remaps = []
+    for shard in shards:
+        remap = []
+        for url, length in zip(shard.urls, shard.doc_lengths):
+            if url in seen:
+                remap.append(None)
+                continue
+            seen.add(url)
+            remap.append(len(merged.urls))
+            merged.urls.append(url)
+            merged.doc_lengths.append(length)
+        remaps.append(remap)
+    for shard, remap in zip(shards, remaps):
+        for term in shard.terms:
+            postings = merged.postings.setdefault(term, [])
+            for doc_id, tf in shard.postings(term):
+                if remap[doc_id] is not None:
+                    postings.append((remap[doc_id], tf))
+    return merged.serialize()
+
+def _min_max(scores):
+    if not scores:
+        return {}
+    low = min(scores.values())
+    high = max(scores.values())
+    span = high - low
+    return {key: (value - low) / span if span else 1.0 for key, value in scores.items()}
+
+def linear_fusion(bm25_scores, vector_scores, alpha=0.5, k=10):
+    """
+    Hybrid ranking from min-max normalized scores:
+    alpha * vector + (1 - alpha) * bm25.
+
+    Args:
+        bm25_scores (dict): url -> BM25 score
+        vector_scores (dict): url -> similarity from the vector index
+
+    Returns:
+        list: (url, fused score) pairs, best first
+    """
+    bm25_norm = _min_max(bm25_scores)
+    vector_norm = _min_max(vector_scores)
+    fused = {
+        url: alpha * vector_norm.get(url, 0.0) + (1.0 - alpha) * bm25_norm.get(url, 0.0)
+        for url in set(bm25_norm) | set(vector_norm)
+    }
+    return heapq.nlargest(k, fused.items(), key=lambda item: item[1])
+
+def reciprocal_rank_fusion(rankings, k=10, rank_constant=60):
+    """
+    Hybrid ranking that only uses ranks: sum of 1 / (rank_constant + rank).
+
+    Args:
+        rankings (list): ranked lists of urls, e.g. BM25 and vector results
+
+    Returns:
+        list: (url, fused score) pairs, best first
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, url in enumerate(ranking, 1):
+            fused[url] = fused.get(url, 0.0) + 1.0 / (rank_constant + rank)
+    return heapq.nlargest(k, fused.items(), key=lambda item: item[1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge and query BM25 index shards")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    merge_parser = subparsers.add_parser("merge", help="Merge shards into one")
+    merge_parser.add_argument("output")
+    merge_parser.add_argument("shards", nargs="+")
+    query_parser = subparsers.add_parser("query", help="Run a BM25 query against a shard")
+    query_parser.add_argument("shard")
+    query_parser.add_argument("query")
+    query_parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == "merge":
+        data = merge_shards([BM25Index.load(path) for path in args.shards])
+        with open(args.output, 'wb') as f:
+            f.write(data)
+        print(f"Merged {len(args.shards)} shards into {args.output} ({len(BM25Index(data))} documents)")
+    else:
+        for url, score in BM25Index.load(args.shard).search(args.query, args.k):
+            print(f"{score:8.3f}  {url}")
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,8 @@ from bs4 import BeautifulSoup
 import re
 import os
 import boto3
-from s3 import upload_bytes, get_input_file_stream, get_warc_file_stream
+from s3 import upload_bytes, get_input_file_stream, get_warc_file_stream, upload_index_shard
+from bm25_index import BM25IndexBuilder
 from langdetect import detect
 import logging
 
@@ -15,6 +16,9 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Build a BM25 inverted index shard per WARC file from the text already in hand
+bm25_index_enabled = os.environ.get('BM25_INDEX_ENABLED', 'false').lower() == 'true'
+
 def sanitize_filename(url):
     parsed = urlparse(url)
     path = parsed.path + (('_' + parsed.query) if parsed.query else '')
@@ -30,7 +34,7 @@ def sanitize_filename(url):
 def to_ascii(s):
     return s.encode('ascii', errors='ignore').decode('ascii')
 
-def process_warc_stream(stream, warc_file):
+def process_warc_stream(stream, warc_file, bm25_builder=None):
     count = 0
     for idx, record in enumerate(ArchiveIterator(stream)):
         # if record.rec_type == 'metadata':
@@ -103,6 +107,8 @@ def process_warc_stream(stream, warc_file):
                 os.path.basename(warc_file),
                 scrape_date
             )
+            if bm25_builder is not None:
+                bm25_builder.add_document(safe_url, article_text)
             count += 1
             if count % 100 == 0:
                 logger.info(f"Processed {count} articles from {warc_file}")
@@ -127,9 +133,15 @@ if __name__ == '__main__':
     total_articles = 0
     for warc_file in warc_files:
         logger.info(f'Processing WARC file: {warc_file}')
+        bm25_builder = BM25IndexBuilder() if bm25_index_enabled else None
         with get_warc_file_stream(warc_file) as warc_stream:
-            articles_processed = process_warc_stream(warc_stream, warc_file)
+            articles_processed = process_warc_stream(warc_stream, warc_file, bm25_builder)
             total_articles += articles_processed
+        if bm25_builder is not None and len(bm25_builder):
+            try:
+                upload_index_shard(bm25_builder.serialize(), f'{os.path.basename(warc_file)}.bm25')
+            except Exception as e:
+                logger.error(f"Error uploading BM25 index shard for {warc_file}: {e}")
         logger.info(f'Finished processing WARC file: {warc_file}')
     
     logger.info(f"Processing completed. Total articles processed: {total_articles}")
@@ -10,12 +10,25 @@ firehose = boto3.client('firehose')
 output_bucket = os.environ.get('OUTPUT_BUCKET', 'sea-news-articles')
 input_bucket = os.environ.get('INPUT_BUCKET', 'sea-warc-input')
 firehose_stream_name = os.environ.get('KINESIS_FIREHOSE_STREAM', '')
+bm25_index_prefix = os.environ.get('BM25_INDEX_PREFIX', 'bm25_index')
 is_local = os.environ.get('IS_LOCAL', 'true').lower() == 'true'
 print(f'Running in {"local" if is_local else "remote"} mode')
 def upload_file(file_path: str, key: str):
     """Upload a local file to S3."""
     s3.upload_file(file_path, output_bucket, key)
 
+def upload_index_shard(data: bytes, name: str):
+    """Store a BM25 index shard under BM25_INDEX_PREFIX (locally when running in local mode)."""
+    key = f'{bm25_index_prefix}/{name}'
+    if is_local:
+        os.makedirs(os.path.dirname(key), exist_ok=True)
+        with open(key, 'wb') as f:
+            f.write(data)
+        print(f'Wrote BM25 index shard to {key}')
+        return
+    s3.put_object(Bucket=output_bucket, Key=key, Body=data)
+    print(f'Uploaded BM25 index shard to s3://{output_bucket}/{key}')
+
 def send_firehose_record(record_data: dict):
     """Send a record to the configured Kinesis Firehose stream in CSV format."""
     if not firehose_stream_name:
@@ -0,0 +1,243 @@
+import os
+import io
+import re
+import csv
+import sys
+import json
+import heapq
+import bisect
+import argparse
+import logging
+
+# Configure logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Column order of the headerless rows written by the Fargate task to Firehose
+INPUT_COLUMNS = ['url', 'title', 'language', 'domain', 'warc_file', 'scrape_date', 'content']
+CONTENT_INDEX = INPUT_COLUMNS.index('content')
+# Upper bounds (characters of content) of the length buckets; longer rows share a final bucket
+DEFAULT_BUCKET_BOUNDARIES = [500, 1000, 2000, 4000, 8000, 16000]
+# SageMaker's default MaxPayloadInMB for batch transform
+DEFAULT_MAX_PAYLOAD_MB = 6
+MANIFEST_NAME = 'manifest.json'
+NEWLINES = re.compile(r'[\r\n]+')
+
+csv.field_size_limit(sys.maxsize)
+
+def parse_s3_uri(s3_uri):
+    """Parse an S3 URI into bucket and key."""
+    if not s3_uri.startswith('s3://'):
+        raise ValueError('Invalid S3 URI')
+    parts = s3_uri[5:].split('/', 1)
+    bucket = parts[0]
+    key = parts[1] if len(parts) > 1 else ''
+    return bucket, key
+
+def _iter_s3_objects(s3_uri):
+    import boto3
+    s3 = boto3.client('s3')
+    bucket, prefix = parse_s3_uri(s3_uri)
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            if not obj['Key'].lower().endswith('.csv'):
+                continue
+            logger.info(f"Reading s3://{bucket}/{obj['Key']}")
+            yield s3.get_object(Bucket=bucket, Key=obj['Key'])['Body'].read()
+
+def _iter_local_files(path):
+    if os.path.isfile(path):
+        paths = [path]
+    else:
+        paths = sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(path)
+            for name in names
+            if name.lower().endswith('.csv')
+        )
+    for file_path in paths:
+        logger.info(f"Reading {file_path}")
+        with open(file_path, 'rb') as f:
+            yield f.read()
+
+def iter_rows(path):
+    """
+    Yield the rows of every delivered Firehose object under a local
+    file/directory or an s3://bucket/prefix. A header row, if present, is
+    skipped; rows with the wrong number of columns are dropped.
+    """
+    objects = _iter_s3_objects(path) if path.startswith('s3://') else _iter_local_files(path)
+    for data in objects:
+        for row in csv.reader(io.StringIO(data.decode('utf-8', errors='replace'), newline='')):
+            if row == INPUT_COLUMNS:
+                continue
+            if len(row) != len(INPUT_COLUMNS):
+                logger.warning(f"Dropping row with {len(row)} columns (expected {len(INPUT_COLUMNS)})")
+                continue
+            yield row
+
+def encode_row(row):
+    """
+    Encode a row as one CSV line. Newlines inside fields (paragraph breaks in
+    article text) are replaced by spaces, since SplitType Line would otherwise
+    split the record.
+    """
+    output = io.StringIO()
+    csv.writer(output, lineterminator='\n').writerow([NEWLINES.sub(' ', value) for value in row])
+    return output.getvalue().encode('utf-8')
+
+def _fit_payload(row, max_payload_bytes):
+    """Truncate the content of a row whose line would exceed the payload limit."""
+    line = encode_row(row)
+    if len(line) <= max_payload_bytes:
+        return row, line
+    logger.warning(f"Truncating content of {row[0]} ({len(line)} bytes) to fit MaxPayloadInMB")
+    row = list(row)
+    # Quoting can make the line longer than the content, so repeat until it fits
+    while len(line) > max_payload_bytes and row[CONTENT_INDEX]:
+        content = row[CONTENT_INDEX].encode('utf-8')
+        excess = len(line) - max_payload_bytes
+        row[CONTENT_INDEX] = content[:max(0, len(content) - excess)].decode('utf-8', errors='ignore')
+        line = encode_row(row)
+    return row, line
+
+def padding_ratio(batches):
+    """
+    Fraction of padded positions if every batch is padded to its longest
+    member, using content characters as a proxy for tokens.
+    """
+    total = sum(sum(lengths) for lengths in batches)
+    padded = sum(max(lengths) * len(lengths) for lengths in batches if lengths)
+    return 1.0 - total / padded if padded else 0.0
+
+def _payload_batches(items, max_payload_bytes):
+    """Split (length, line) items, in order, into batches of at most max_payload_bytes."""
+    batches = []
+    batch = []
+    size = 0
+    for item in items:
+        if batch and size + len(item[1]) > max_payload_bytes:
+            batches.append(batch)
+            batch = []
+            size = 0
+        batch.append(item)
+        size += len(item[1])
+    if batch:
+        batches.append(batch)
+    return batches
+
+def pack(rows, num_files, max_payload_mb=DEFAULT_MAX_PAYLOAD_MB, boundaries=DEFAULT_BUCKET_BOUNDARIES):
+    """
+    Repack rows into num_files transform input files.
+
+    Rows are sorted by content length and grouped into length buckets; each
+    bucket is cut into runs of at most MaxPayloadInMB, so the mini-batches the
+    transform job reads from consecutive lines hold articles of similar length.
+    Runs are then spread over the files longest-processing-time first, using
+    content characters as the cost, so every instance gets a similar amount of
+    work. Within a file, runs stay in ascending length order.
+
+    Args:
+        rows (iterable): rows in INPUT_COLUMNS order
+        num_files (int): output files, normally a multiple of the instance count
+        max_payload_mb (int): MaxPayloadInMB of the transform job
+        boundaries (list): upper content lengths of the buckets
+
+    Returns:
+        tuple: (list of files, each a list of encoded lines; stats dict)
+    """
+    max_payload_bytes = max_payload_mb * 1024 * 1024
+    items = []
+    for row in rows:
+        row, line = _fit_payload(row, max_payload_bytes)
+        items.append((len(row[CONTENT_INDEX]), line))
+    arrival_padding = padding_ratio(
+        [[length for length, _ in batch] for batch in _payload_batches(items, max_payload_bytes)])
+
+    buckets = {}
+    for item in sorted(items, key=lambda item: item[0]):
+        buckets.setdefault(bisect.bisect_left(boundaries, item[0]), []).append(item)
+    runs = []
+    for bucket in sorted(buckets):
+        for batch in _payload_batches(buckets[bucket], max_payload_bytes):
+            runs.append((sum(length for length, _ in batch), len(runs), batch))
+
+    # Longest-processing-time assignment: largest run to the least loaded file
+    loads = [(0, file_index) for file_index in range(num_files)]
+    assigned = [[] for _ in range(num_files)]
+    for cost, order, batch in sorted(runs, key=lambda run: -run[0]):
+        load, file_index = heapq.heappop(loads)
+        assigned[file_index].append((order, batch))
+        heapq.heappush(loads, (load + cost, file_index))
+
+    files = []
+    for file_runs in assigned:
+        if file_runs:
+            files.append([line for _, batch in sorted(file_runs) for _, line in batch])
+    stats = {
+        'rows': len(items),
+        'files': len(files),
+        'payload_runs': len(runs),
+        'bucket_rows': {
+            (f"<={boundaries[bucket]}" if bucket < len(boundaries) else f">{boundaries[-1]}"): len(buckets[bucket])
+            for bucket in sorted(buckets)
+        },
+        'file_costs': sorted(load for load, _ in loads if load),
+        'padding_ratio_before': arrival_padding,
+        'padding_ratio_after': padding_ratio([[length for length, _ in batch] for _, _, batch in runs])
+    }
+    return files, stats
+
+def write_packed(files, output_path):
+    """
+    Write the packed files and a transform job manifest to a local directory
+    or an s3://bucket/prefix. Parts have no .csv suffix so they do not trigger
+    the per-prefix transform Lambda; the manifest is written last.
+
+    Returns:
+        str: location of the manifest
+    """
+    output_path = output_path.rstrip('/') + '/'
+    names = [f"part-{index:05d}" for index in range(len(files))]
+    manifest = json.dumps([{'prefix': output_path}] + names, indent=2).encode('utf-8')
+    if output_path.startswith('s3://'):
+        import boto3
+        s3 = boto3.client('s3')
+        bucket, prefix = parse_s3_uri(output_path)
+        for name, lines in zip(names, files):
+            s3.put_object(Bucket=bucket, Key=prefix + name, Body=b''.join(lines))
+        s3.put_object(Bucket=bucket, Key=prefix + MANIFEST_NAME, Body=manifest)
+    else:
+        os.makedirs(output_path, exist_ok=True)
+        for name, lines in zip(names, files):
+            with open(os.path.join(output_path, name), 'wb') as f:
+                f.writelines(lines)
+        with open(os.path.join(output_path, MANIFEST_NAME), 'wb') as f:
+            f.write(manifest)
+    logger.info(f"Wrote {len(files)} packed files and {MANIFEST_NAME} to {output_path}")
+    return output_path + MANIFEST_NAME
+
+def main():
+    parser = argparse.ArgumentParser(description="Repack Firehose output into length-sorted transform inputs")
+    parser.add_argument("--input", required=True, help="Firehose output file, directory or s3://bucket/prefix")
+    parser.add_argument("--output", required=True, help="Output directory or s3://bucket/prefix")
+    parser.add_argument("--instance-count", type=int, default=1)
+    parser.add_argument("--files-per-instance", type=int, default=1)
+    parser.add_argument("--max-payload-mb", type=int, default=DEFAULT_MAX_PAYLOAD_MB)
+    parser.add_argument("--buckets", default=','.join(str(b) for b in DEFAULT_BUCKET_BOUNDARIES),
+                        help="Comma-separated upper content lengths of the length buckets")
+    args = parser.parse_args()
+
+    boundaries = sorted(int(value) for value in args.buckets.split(',') if value.strip())
+    files, stats = pack(iter_rows(args.input), args.instance_count * args.files_per_instance,
+                        args.max_payload_mb, boundaries)
+    if not files:
+        logger.warning(f"No rows found in {args.input}")
+        return
+    for key, value in stats.items():
+        logger.info(f"{key}: {value}")
+    write_packed(files, args.output)
+
+if __name__ == "__main__":
+    main()
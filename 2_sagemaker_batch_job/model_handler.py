@@ -1,13 +1,94 @@
 import os
+import queue
+import threading
+import time
 import torch
 import json
 import numpy as np
+from concurrent.futures import Future
+
+class MicroBatcher:
+    """
+    Collect concurrent requests for up to max_batch_size items or
+    max_delay_ms after the first one arrives, run them as one batch and
+    hand each caller its own slice of the output. Callers wait at most
+    timeout seconds for their result.
+    """
+    def __init__(self, run_batch, max_batch_size=8, max_delay_ms=5, timeout=60):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay_ms / 1000.0
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, array):
+        """
+        Queue a single sample and block until its output is ready.
+        """
+        future = Future()
+        self._queue.put((array, future))
+        return future.result(timeout=self.timeout)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Finish this batch, then stop
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            # Only samples of the same shape can be stacked together
+            groups = {}
+            for array, future in batch:
+                groups.setdefault(array.shape, []).append((array, future))
+            for group in groups.values():
+                try:
+                    outputs = self.run_batch(np.stack([array for array, _ in group]))
+                    if len(outputs) != len(group):
+                        raise ValueError(f"Batch of {len(group)} samples returned {len(outputs)} outputs")
+                    for (_, future), output in zip(group, outputs):
+                        future.set_result(output)
+                except Exception as e:
+                    for _, future in group:
+                        if not future.done():
+                            future.set_exception(e)
 
 class ModelHandler:
     def __init__(self):
         self.model = None
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         self.initialized = False
+        self.batcher = None
+        # Requests handled concurrently are batched for up to MAX_BATCH_DELAY_MS
+        self.max_batch_size = int(os.environ.get('MAX_BATCH_SIZE', '8'))
+        self.max_batch_delay_ms = float(os.environ.get('MAX_BATCH_DELAY_MS', '5'))
+        # Seconds a request waits for its batched result before failing
+        self.batch_timeout = float(os.environ.get('BATCH_REQUEST_TIMEOUT', '60'))
+        # Shape of a single sample, e.g. "128" or "3,224,224"; enables warm-up
+        warmup_shape = os.environ.get('WARMUP_INPUT_SHAPE', '')
+        self.warmup_shape = tuple(int(dim) for dim in warmup_shape.split(',') if dim.strip())
 
     def initialize(self, model_dir):
         """
@@ -16,24 +97,40 @@ class ModelHandler:
         model_path = os.path.join(model_dir, 'model.pth')
         self.model = torch.load(model_path, map_location=self.device)
         self.model.eval()
+        self.batcher = MicroBatcher(self.inference_batch, self.max_batch_size, self.max_batch_delay_ms,
+                                    self.batch_timeout)
+        self.warmup()
         self.initialized = True
         print("Model loaded successfully")
 
+    def warmup(self):
+        """
+        Run a full-size batch through the model so the first requests do not
+        pay for lazy initialization
+        """
+        if not self.warmup_shape:
+            print("WARMUP_INPUT_SHAPE not set, skipping warm-up")
+            return
+        self.inference_batch(np.zeros((self.max_batch_size,) + self.warmup_shape, dtype=np.float32))
+        print(f"Warm-up done with batch shape {(self.max_batch_size,) + self.warmup_shape}")
+
+    def to_array(self, input_data):
+        """
+        Convert the request to a float32 numpy array without copying binary input
+        """
+        if isinstance(input_data, str):
+            # If the input is a string (like JSON)
+            return np.asarray(json.loads(input_data)['inputs'], dtype=np.float32)
+        # If the input is binary, view the buffer directly
+        return np.frombuffer(input_data, dtype=np.float32)
+
     def preprocess(self, input_data):
         """
         Preprocess the input data
         """
         # Convert input to appropriate format for your model
         # This is just an example - adjust based on your input format
-        if isinstance(input_data, str):
-            # If the input is a string (like JSON)
-            input_json = json.loads(input_data)
-            input_tensor = torch.tensor(input_json['inputs'], dtype=torch.float32).to(self.device)
-        else:
-            # If the input is binary
-            input_tensor = torch.tensor(np.frombuffer(input_data, dtype=np.float32)).to(self.device)
-            
-        return input_tensor
+        return torch.tensor(self.to_array(input_data)).to(self.device)
 
     def inference(self, input_tensor):
         """
@@ -43,6 +140,13 @@ class ModelHandler:
             predictions = self.model(input_tensor)
         return predictions
 
+    def inference_batch(self, batch_array):
+        """
+        Run inference on samples stacked along a new leading batch dimension
+        """
+        # np.stack already made a fresh contiguous array, so share its memory
+        return self.inference(torch.from_numpy(batch_array).to(self.device))
+
     def postprocess(self, inference_output):
         """
         Post-process the model output
@@ -51,3 +155,10 @@ class ModelHandler:
         return json.dumps({
             'predictions': inference_output.cpu().numpy().tolist()
         })
+
+    def handle(self, input_data):
+        """
+        Run one request through the micro-batcher; safe to call from
+        concurrent request threads
+        """
+        return self.postprocess(self.batcher.submit(self.to_array(input_data)))
@@ -0,0 +1,60 @@
+import time
+import argparse
+import logging
+import numpy as np
+from flat_index import FlatIndex
+
+# Configure logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def time_search(index, queries, batch_size, k, filters):
+    """
+    Run all queries in batches and return per-query latency in ms and the
+    number of rows that passed the filters.
+    """
+    start = time.perf_counter()
+    for offset in range(0, len(queries), batch_size):
+        index.search(queries[offset:offset + batch_size], k=k, **filters)
+    elapsed = time.perf_counter() - start
+    rows = index.filter_rows(**filters)
+    return 1000 * elapsed / len(queries), index.count if rows is None else len(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency of exact filtered top-k search on a flat index")
+    parser.add_argument("--index-dir", default="flat_index")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--batch-sizes", default="1,16,64", help="Comma separated query batch sizes")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--window-days", type=int, default=7, help="Length of the scrape_date window scenario")
+    args = parser.parse_args()
+
+    index = FlatIndex(args.index_dir)
+    rng = np.random.default_rng(0)
+    queries = np.asarray(index.vectors[rng.choice(index.count, size=min(args.queries, index.count), replace=False)],
+                         dtype=np.float32)
+
+    # Most common domain, and a window in the middle of the scraped days
+    domain_sizes = [
+        int(np.unpackbits(bitmap, count=index.count).sum()) for bitmap in index.bitmaps['domain']
+    ]
+    domain = index.category_values['domain'][int(np.argmax(domain_sizes))]
+    middle = len(index.days) // 2
+    date_from = index.days[max(0, middle - args.window_days // 2)]
+    date_to = index.days[min(len(index.days) - 1, middle + args.window_days // 2)]
+    scenarios = [
+        ("unfiltered", {}),
+        (f"domain={domain}", {"domain": domain}),
+        (f"{date_from}..{date_to}", {"date_from": date_from, "date_to": date_to}),
+        ("domain+window", {"domain": domain, "date_from": date_from, "date_to": date_to}),
+    ]
+
+    print(f"Index: {index.count} x {index.dim} ({index.vectors.dtype}), queries: {len(queries)}, k={args.k}")
+    print(f"{'scenario':>28} {'rows':>9} {'batch':>6} {'ms/query':>9}")
+    for name, filters in scenarios:
+        for batch_size in [int(v) for v in args.batch_sizes.split(',') if v.strip()]:
+            ms, rows = time_search(index, queries, batch_size, args.k, filters)
+            print(f"{name:>28} {rows:>9} {batch_size:>6} {ms:>9.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import time
+import argparse
+import logging
+import numpy as np
+from quantization import ScalarQuantizer, ProductQuantizer, exact_search, normalize, rerank, without_query
+from transform_output import load_embeddings
+
+# Configure logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def recall(found, expected, query_ids, k):
+    """
+    recall@k of found against expected, both searched for k + 1 results.
+    The queries are indexed vectors, so each query's own id is dropped from
+    both lists first.
+    """
+    hits = 0
+    total = 0
+    for query_id, f, e in zip(query_ids, found, expected):
+        e = without_query(e.tolist(), query_id, k)
+        hits += len(set(without_query(f.tolist(), query_id, k)) & set(e))
+        total += len(e)
+    return hits / total if total else 0.0
+
+def benchmark(name, quantizer, vectors, train_sample, query_ids, expected, k, rerank_factor=0):
+    start = time.perf_counter()
+    quantizer.train(train_sample)
+    train_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    codes = quantizer.encode(vectors)
+    encode_seconds = time.perf_counter() - start
+    queries = vectors[query_ids]
+    start = time.perf_counter()
+    if rerank_factor:
+        shortlist, _ = quantizer.search(codes, queries, (k + 1) * rerank_factor)
+        found, _ = rerank(shortlist, vectors, queries, k + 1)
+    else:
+        found, _ = quantizer.search(codes, queries, k + 1)
+    search_seconds = time.perf_counter() - start
+    return {
+        "method": name,
+        "bytes_per_vector": quantizer.code_size,
+        "compression": vectors.shape[1] * 4 / quantizer.code_size,
+        f"recall@{k}": recall(found, expected, query_ids, k),
+        "ms_per_query": 1000 * search_seconds / len(queries),
+        "train_s": train_seconds,
+        "encode_s": encode_seconds
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare int8 and product quantization against exact float32 search")
+    parser.add_argument("--input", required=True, help="Transform output file, directory or s3://bucket/prefix")
+    parser.add_argument("--train-sample", type=int, default=10000, help="Vectors used to train the codebooks")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--pq-subspaces", default="96,48", help="Comma separated PQ subspace counts")
+    parser.add_argument("--rerank-factor", type=int, default=10,
+                        help="Also report PQ with the top k*factor candidates re-scored exactly; 0 to skip")
+    args = parser.parse_args()
+
+    _, vectors = load_embeddings(args.input)
+    vectors = normalize(vectors)
+    rng = np.random.default_rng(0)
+    train_sample = vectors[rng.choice(len(vectors), size=min(args.train_sample, len(vectors)), replace=False)]
+    query_ids = rng.choice(len(vectors), size=min(args.queries, len(vectors)), replace=False)
+    k = min(args.k, len(vectors) - 1)
+
+    start = time.perf_counter()
+    expected = exact_search(vectors, vectors[query_ids], k + 1)
+    exact_ms = 1000 * (time.perf_counter() - start) / len(query_ids)
+
+    results = [{
+        "method": "float32",
+        "bytes_per_vector": vectors.shape[1] * 4,
+        "compression": 1.0,
+        f"recall@{k}": 1.0,
+        "ms_per_query": exact_ms,
+        "train_s": 0.0,
+        "encode_s": 0.0
+    }]
+    results.append(benchmark("int8", ScalarQuantizer(), vectors, train_sample, query_ids, expected, k))
+    for num_subspaces in [int(v) for v in args.pq_subspaces.split(',') if v.strip()]:
+        if vectors.shape[1] % num_subspaces:
+            logger.warning(f"Skipping PQ with {num_subspaces} subspaces: dimension {vectors.shape[1]} is not divisible")
+            continue
+        results.append(benchmark(f"pq{num_subspaces}", ProductQuantizer(num_subspaces), vectors,
+                                 train_sample, query_ids, expected, k))
+        if args.rerank_factor:
+            results.append(benchmark(f"pq{num_subspaces}+rr", ProductQuantizer(num_subspaces), vectors,
+                                     train_sample, query_ids, expected, k, args.rerank_factor))
+
+    print(f"Vectors: {len(vectors)} x {vectors.shape[1]}, queries: {len(query_ids)}")
+    print(f"{'method':>10} {'bytes/vec':>10} {'ratio':>7} {'recall@' + str(k):>10} {'ms/query':>9} {'train s':>8} {'encode s':>9}")
+    for r in results:
+        print(f"{r['method']:>10} {r['bytes_per_vector']:>10} {r['compression']:>7.1f} {r[f'recall@{k}']:>10.3f} "
+              f"{r['ms_per_query']:>9.3f} {r['train_s']:>8.1f} {r['encode_s']:>9.1f}")
+
+if __name__ == "__main__":
+    main()
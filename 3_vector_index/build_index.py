@@ -0,0 +1,104 @@
+import os
+import time
+import itertools
+import argparse
+import logging
+import numpy as np
+from hnsw_index import HNSWIndex
+from quantization import exact_search, without_query
+from transform_output import iter_records
+
+# Configure logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Records inserted per add_batch call, and progress log interval
+BUILD_BATCH_SIZE = 1000
+
+def evaluate_recall(index, num_queries=200, k=10, ef=64, seed=0):
+    """
+    Compare HNSW search against brute force on a sample of indexed vectors.
+    Each query is an indexed vector, so its own id is excluded from both
+    result lists; otherwise every query would trivially find itself.
+
+    Returns:
+        dict: recall@k and mean per-query latency of both searches
+    """
+    rng = np.random.default_rng(seed)
+    vectors = np.asarray(index.vectors[:index.count])
+    sample = rng.choice(index.count, size=min(num_queries, index.count), replace=False)
+    queries = vectors[sample]
+
+    start = time.perf_counter()
+    exact = exact_search(vectors, queries, k + 1)
+    exact_seconds = time.perf_counter() - start
+
+    hits = 0
+    expected_total = 0
+    start = time.perf_counter()
+    for query_id, query, exact_ids in zip(sample, queries, exact):
+        ids, _ = index.search(query, k=k + 1, ef=ef)
+        expected = without_query(exact_ids.tolist(), query_id, k)
+        hits += len(set(without_query(ids.tolist(), query_id, k)) & set(expected))
+        expected_total += len(expected)
+    ann_seconds = time.perf_counter() - start
+    return {
+        f"recall@{k}": hits / expected_total if expected_total else 0.0,
+        "ef_search": ef,
+        "queries": len(queries),
+        "hnsw_ms_per_query": 1000 * ann_seconds / len(queries),
+        "brute_force_ms_per_query": 1000 * exact_seconds / len(queries)
+    }
+
+def build(input_path, index_dir, m=16, ef_construction=200):
+    """
+    Add every embedded row under input_path to the index in index_dir,
+    creating it if needed. Rows whose url is already indexed are skipped.
+    """
+    index = None
+    if os.path.exists(os.path.join(index_dir, 'index.json')):
+        index = HNSWIndex.load(index_dir)
+        logger.info(f"Loaded existing index with {len(index)} vectors from {index_dir}")
+
+    added = 0
+    skipped = 0
+    start = time.perf_counter()
+    records = iter_records(input_path)
+    while True:
+        batch = list(itertools.islice(records, BUILD_BATCH_SIZE))
+        if not batch:
+            break
+        if index is None:
+            index = HNSWIndex(len(batch[0][1]), m=m, ef_construction=ef_construction)
+        batch_added = index.add_batch([embedding for _, embedding in batch], [meta for meta, _ in batch])
+        added += batch_added
+        skipped += len(batch) - batch_added
+        logger.info(f"Added {added} vectors ({added / (time.perf_counter() - start):.1f} vectors/s)")
+    elapsed = time.perf_counter() - start
+    if index is None:
+        logger.warning(f"No embeddings found in {input_path}")
+        return None
+    logger.info(f"Added {added} vectors in {elapsed:.1f}s "
+                f"({added / elapsed if elapsed else 0.0:.1f} vectors/s), skipped {skipped} already indexed")
+    if added:
+        index.save(index_dir)
+    return index
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or extend an HNSW index from batch transform output")
+    parser.add_argument("--input", required=True, help="Transform output file, directory or s3://bucket/prefix")
+    parser.add_argument("--index-dir", default="index")
+    parser.add_argument("--m", type=int, default=16, help="Links per node (2*m on level 0)")
+    parser.add_argument("--ef-construction", type=int, default=200)
+    parser.add_argument("--eval-queries", type=int, default=200, help="Queries used for recall@k; 0 to skip")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--ef-search", type=int, default=64)
+    args = parser.parse_args()
+
+    index = build(args.input, args.index_dir, args.m, args.ef_construction)
+    if index is not None and args.eval_queries:
+        for key, value in evaluate_recall(index, args.eval_queries, args.k, args.ef_search).items():
+            logger.info(f"{key}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+import os
+import json
+import bisect
+import shutil
+import argparse
+import logging
+import numpy as np
+from quantization import top_k
+from transform_output import load_embeddings
+
+# Configure logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+# Metadata fields with one bitmap per distinct value
+CATEGORY_FIELDS = ['domain', 'language', 'sentiment']
+# Rows scored per block, to bound temporary memory
+SEARCH_BLOCK_ROWS = 65536
+# Above this fraction of matching rows, scanning contiguous blocks and masking
+# the scores is cheaper than gathering the matching rows from the memory map
+DENSE_FILTER_RATIO = 0.25
+
+def _day(scrape_date):
+    return (scrape_date or '')[:10]
+
+class FlatIndex:
+    """
+    Exact top-k over a memory-mapped matrix of normalized vectors.
+
+    Filters on domain, language, sentiment and scrape_date range are resolved
+    with packed bitmaps built once at index time: one bitmap per category
+    value and one cumulative bitmap per day ("scraped on or before this day"),
+    so a date window is two bitmaps and one AND-NOT. Rows without a
+    scrape_date never match a date filter.
+    """
+    def __init__(self, index_dir):
+        with open(os.path.join(index_dir, 'index.json'), encoding='utf-8') as f:
+            header = json.load(f)
+        if header['format_version'] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported index format version: {header['format_version']}")
+        self.count = header['count']
+        self.dim = header['dim']
+        self.vectors = np.load(os.path.join(index_dir, 'vectors.npy'), mmap_mode='r')
+        self.category_values = header['category_values']
+        self.bitmaps = {
+            field: np.load(os.path.join(index_dir, f'bitmaps_{field}.npy'), mmap_mode='r')
+            for field in CATEGORY_FIELDS
+        }
+        self.days = header['days']
+        self.day_bitmaps = np.load(os.path.join(index_dir, 'bitmaps_scrape_date.npy'), mmap_mode='r')
+        with open(os.path.join(index_dir, 'metadata.jsonl'), encoding='utf-8') as f:
+            self.metadata = [json.loads(line) for line in f]
+
+    @staticmethod
+    def build(metadata, vectors, index_dir, dtype='float32'):
+        """
+        Write a flat index of the normalized vectors and their filter bitmaps.
+
+        Args:
+            metadata (list): dict per row with the CATEGORY_FIELDS and scrape_date
+            vectors (np.ndarray): (n, dim) embeddings
+            index_dir (str): Output directory, replaced if it exists
+            dtype (str): 'float32' or 'float16' storage for the vectors
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        if os.path.exists(index_dir):
+            shutil.rmtree(index_dir)
+        os.makedirs(index_dir)
+        np.save(os.path.join(index_dir, 'vectors.npy'), (vectors / norms).astype(dtype))
+
+        category_values = {}
+        for field in CATEGORY_FIELDS:
+            values, codes = np.unique([meta.get(field) or '' for meta in metadata], return_inverse=True)
+            category_values[field] = values.tolist()
+            bitmaps = np.packbits(codes[None, :] == np.arange(len(values))[:, None], axis=1)
+            np.save(os.path.join(index_dir, f'bitmaps_{field}.npy'), bitmaps)
+
+        # Undated rows get a code past the last day, so no date filter matches them
+        row_days = [_day(meta.get('scrape_date')) for meta in metadata]
+        days = sorted({day for day in row_days if day})
+        day_codes = np.array([bisect.bisect_left(days, day) if day else len(days) for day in row_days], dtype=np.int64)
+        cumulative = np.packbits(day_codes[None, :] <= np.arange(len(days))[:, None], axis=1)
+        np.save(os.path.join(index_dir, 'bitmaps_scrape_date.npy'), cumulative)
+
+        with open(os.path.join(index_dir, 'metadata.jsonl'), 'w', encoding='utf-8') as f:
+            for meta in metadata:
+                f.write(json.dumps(meta) + '\n')
+        with open(os.path.join(index_dir, 'index.json'), 'w', encoding='utf-8') as f:
+            json.dump({
+                'format_version': FORMAT_VERSION,
+                'count': len(vectors),
+                'dim': vectors.shape[1] if len(vectors) else 0,
+                'dtype': dtype,
+                'category_values': category_values,
+                'days': days
+            }, f)
+        logger.info(f"Saved flat index with {len(vectors)} vectors to {index_dir}")
+
+    def _category_bitmap(self, field, values):
+        if isinstance(values, str):
+            values = [values]
+        known = self.category_values[field]
+        rows = [known.index(value) for value in values if value in known]
+        if not rows:
+            return np.zeros(self.bitmaps[field].shape[1], dtype=np.uint8)
+        return np.bitwise_or.reduce(self.bitmaps[field][rows], axis=0)
+
+    def _date_bitmap(self, date_from=None, date_to=None):
+        width = self.day_bitmaps.shape[1]
+        # Last day <= date_to, and last day < date_from
+        end = bisect.bisect_right(self.days, date_to) - 1 if date_to else len(self.days) - 1
+        start = bisect.bisect_left(self.days, date_from) - 1 if date_from else -1
+        upto_end = self.day_bitmaps[end] if end >= 0 else np.zeros(width, dtype=np.uint8)
+        if start < 0:
+            return upto_end
+        return upto_end & ~self.day_bitmaps[start]
+
+    def filter_mask(self, domain=None, language=None, sentiment=None, date_from=None, date_to=None):
+        """
+        Boolean mask of the rows matching every given filter; a list means any
+        of its values. Dates are inclusive 'YYYY-MM-DD' strings.
+
+        Returns:
+            np.ndarray: bool mask of length count, or None when no filter is given
+        """
+        bitmaps = []
+        for field, values in (('domain', domain), ('language', language), ('sentiment', sentiment)):
+            if values is not None:
+                bitmaps.append(self._category_bitmap(field, values))
+        if date_from or date_to:
+            bitmaps.append(self._date_bitmap(date_from, date_to))
+        if not bitmaps:
+            return None
+        return np.unpackbits(np.bitwise_and.reduce(bitmaps, axis=0), count=self.count).astype(bool)
+
+    def filter_rows(self, **filters):
+        """
+        Row ids matching the filters (see filter_mask), or None without filters.
+        """
+        mask = self.filter_mask(**filters)
+        return None if mask is None else np.flatnonzero(mask)
+
+    def _blocks(self, mask):
+        """
+        Yield (row ids, vectors, mask or None) blocks to score.
+        """
+        if mask is None or mask.sum() > DENSE_FILTER_RATIO * self.count:
+            for start in range(0, self.count, SEARCH_BLOCK_ROWS):
+                end = min(start + SEARCH_BLOCK_ROWS, self.count)
+                yield np.arange(start, end), self.vectors[start:end], None if mask is None else mask[start:end]
+            return
+        rows = np.flatnonzero(mask)
+        for start in range(0, len(rows), SEARCH_BLOCK_ROWS):
+            block_ids = rows[start:start + SEARCH_BLOCK_ROWS]
+            yield block_ids, self.vectors[block_ids], None
+
+    def search(self, queries, k=10, **filters):
+        """
+        Exact top-k by cosine similarity for a batch of queries.
+
+        Args:
+            queries (np.ndarray): (dim,) or (num_queries, dim)
+            k (int): Results per query
+            **filters: domain, language, sentiment, date_from, date_to
+
+        Returns:
+            tuple: (ids, scores) of shape (num_queries, k); ids are -1 and
+            scores -inf where fewer than k rows match
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        queries = queries / norms
+
+        best_ids = np.full((len(queries), k), -1, dtype=np.int64)
+        best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        for block_ids, block, block_mask in self._blocks(self.filter_mask(**filters)):
+            block_scores = queries @ block.astype(np.float32, copy=False).T
+            if block_mask is not None:
+                block_scores[:, ~block_mask] = -np.inf
+            scores = np.concatenate([best_scores, block_scores], axis=1)
+            ids = np.concatenate([best_ids, np.broadcast_to(block_ids, (len(queries), len(block_ids)))], axis=1)
+            top = top_k(scores, k)
+            best_scores = np.take_along_axis(scores, top, axis=1)
+            best_ids = np.take_along_axis(ids, top, axis=1)
+        best_ids[np.isneginf(best_scores)] = -1
+        return best_ids, best_scores
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a flat exact-search index from batch transform output")
+    parser.add_argument("--input", required=True, help="Transform output file, directory or s3://bucket/prefix")
+    parser.add_argument("--index-dir", default="flat_index")
+    parser.add_argument("--dtype", choices=['float32', 'float16'], default='float32')
+    args = parser.parse_args()
+
+    metadata, vectors = load_embeddings(args.input)
+    FlatIndex.build(metadata, vectors, args.index_dir, args.dtype)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+import os
+import json
+import math
+import heapq
+import shutil
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+class HNSWIndex:
+    """
+    Hierarchical Navigable Small World graph over cosine similarity.
+
+    Vectors are L2-normalized on insert so distance is 1 - dot product.
+    The index is saved as a directory of .npy files that can be opened with
+    mmap_mode='r' for searching; adding to a loaded index inserts the new
+    nodes into the existing graph instead of rebuilding it.
+    """
+    def __init__(self, dim, m=16, ef_construction=200, seed=42):
+        self.dim = dim
+        self.m = m
+        self.m0 = 2 * m
+        self.ef_construction = ef_construction
+        self.level_mult = 1.0 / math.log(m)
+        self.rng = np.random.default_rng(seed)
+        self.count = 0
+        self.vectors = np.empty((0, dim), dtype=np.float32)
+        # Level 0 links for every node, padded with -1
+        self.level0 = np.empty((0, self.m0), dtype=np.int32)
+        self.levels = np.empty(0, dtype=np.int8)
+        # upper[level - 1] maps node -> list of neighbor ids
+        self.upper = []
+        self.entry_point = -1
+        self.max_level = -1
+        self.metadata = []
+        self._urls = set()
+
+    def __len__(self):
+        return self.count
+
+    def _reserve(self, size):
+        capacity = len(self.vectors)
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity, 1024)
+        vectors = np.empty((capacity, self.dim), dtype=np.float32)
+        vectors[:self.count] = self.vectors[:self.count]
+        level0 = np.full((capacity, self.m0), -1, dtype=np.int32)
+        level0[:self.count] = self.level0[:self.count]
+        levels = np.zeros(capacity, dtype=np.int8)
+        levels[:self.count] = self.levels[:self.count]
+        self.vectors, self.level0, self.levels = vectors, level0, levels
+
+    def _neighbors(self, node, level):
+        if level == 0:
+            row = self.level0[node]
+            return row[row >= 0].tolist()
+        return self.upper[level - 1].get(node, [])
+
+    def _set_neighbors(self, node, level, neighbors):
+        if level == 0:
+            self.level0[node] = -1
+            self.level0[node, :len(neighbors)] = neighbors
+        else:
+            self.upper[level - 1][node] = list(neighbors)
+
+    def _search_layer(self, query, entry_points, ef, level):
+        """
+        Beam search on one layer.
+
+        Returns:
+            list: (distance, node) pairs sorted by ascending distance
+        """
+        visited = set(entry_points)
+        dists = (1.0 - self.vectors[entry_points] @ query).tolist()
+        candidates = list(zip(dists, entry_points))
+        heapq.heapify(candidates)
+        results = [(-d, n) for d, n in candidates]
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+        while candidates:
+            dist, node = heapq.heappop(candidates)
+            if dist > -results[0][0] and len(results) >= ef:
+                break
+            neighbors = [n for n in self._neighbors(node, level) if n not in visited]
+            if not neighbors:
+                continue
+            visited.update(neighbors)
+            neighbor_dists = (1.0 - self.vectors[neighbors] @ query).tolist()
+            for neighbor_dist, neighbor in zip(neighbor_dists, neighbors):
+                if len(results) < ef or neighbor_dist < -results[0][0]:
+                    heapq.heappush(candidates, (neighbor_dist, neighbor))
+                    heapq.heappush(results, (-neighbor_dist, neighbor))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+        return sorted((-d, n) for d, n in results)
+
+    def _select_neighbors(self, candidates, m):
+        """
+        Neighbor selection heuristic: keep a candidate only if it is closer
+        to the query than to every neighbor already kept, then fill up with
+        the closest pruned candidates.
+        """
+        if len(candidates) <= m:
+            return [n for _, n in candidates]
+        nodes = [n for _, n in candidates]
+        vectors = self.vectors[nodes]
+        similarities = vectors @ vectors.T
+        selected = []
+        pruned = []
+        for i, (dist, _) in enumerate(candidates):
+            if len(selected) >= m:
+                break
+            if not selected or (1.0 - similarities[i, selected]).min() > dist:
+                selected.append(i)
+            else:
+                pruned.append(i)
+        selected.extend(pruned[:m - len(selected)])
+        return [nodes[i] for i in selected]
+
+    def _connect(self, node, neighbor, level):
+        max_links = self.m0 if level == 0 else self.m
+        links = self._neighbors(neighbor, level)
+        if len(links) < max_links:
+            links.append(node)
+            self._set_neighbors(neighbor, level, links)
+            return
+        links.append(node)
+        dists = (1.0 - self.vectors[links] @ self.vectors[neighbor]).tolist()
+        self._set_neighbors(neighbor, level, self._select_neighbors(sorted(zip(dists, links)), max_links))
+
+    def add(self, vector, metadata=None):
+        """
+        Insert one vector into the graph.
+
+        Returns:
+            int: id of the new node
+        """
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        node = self.count
+        self._reserve(node + 1)
+        self.vectors[node] = vector / norm if norm else vector
+        self.count += 1
+        self.metadata.append(metadata)
+        if metadata and metadata.get('url'):
+            self._urls.add(metadata['url'])
+
+        level = int(-math.log(1.0 - self.rng.random()) * self.level_mult)
+        self.levels[node] = level
+        while len(self.upper) < level:
+            self.upper.append({})
+        if self.entry_point < 0:
+            self.entry_point = node
+            self.max_level = level
+            return node
+
+        query = self.vectors[node]
+        entry = [self.entry_point]
+        for lc in range(self.max_level, level, -1):
+            entry = [self._search_layer(query, entry, 1, lc)[0][1]]
+        for lc in range(min(level, self.max_level), -1, -1):
+            found = self._search_layer(query, entry, self.ef_construction, lc)
+            neighbors = self._select_neighbors(found, self.m)
+            self._set_neighbors(node, lc, neighbors)
+            for neighbor in neighbors:
+                self._connect(node, neighbor, lc)
+            entry = [n for _, n in found]
+        if level > self.max_level:
+            self.entry_point = node
+            self.max_level = level
+        return node
+
+    def add_batch(self, vectors, metadata=None):
+        """
+        Insert a batch of vectors, skipping rows whose url is already indexed.
+
+        Returns:
+            int: number of vectors inserted
+        """
+        added = 0
+        self._reserve(self.count + len(vectors))
+        for idx, vector in enumerate(vectors):
+            meta = metadata[idx] if metadata is not None else None
+            if meta and meta.get('url') in self._urls:
+                continue
+            self.add(vector, meta)
+            added += 1
+        return added
+
+    def search(self, query, k=10, ef=64):
+        """
+        Approximate top-k by cosine similarity.
+
+        Returns:
+            tuple: (ids, similarities) as numpy arrays, best first
+        """
+        if self.count == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        query = np.asarray(query, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        entry = [self.entry_point]
+        for lc in range(self.max_level, 0, -1):
+            entry = [self._search_layer(query, entry, 1, lc)[0][1]]
+        found = self._search_layer(query, entry, max(ef, k), 0)[:k]
+        ids = np.array([n for _, n in found], dtype=np.int64)
+        similarities = np.array([1.0 - d for d, _ in found], dtype=np.float32)
+        return ids, similarities
+
+    def save(self, index_dir):
+        """
+        Write the index to index_dir, replacing any previous version.
+        """
+        tmp_dir = index_dir.rstrip('/') + '.tmp'
+        if os.path.exists(tmp_dir):
+            shutil.rmtree(tmp_dir)
+        os.makedirs(tmp_dir)
+        np.save(os.path.join(tmp_dir, 'vectors.npy'), self.vectors[:self.count])
+        np.save(os.path.join(tmp_dir, 'level0.npy'), self.level0[:self.count])
+        np.save(os.path.join(tmp_dir, 'levels.npy'), self.levels[:self.count])
+        for level, links in enumerate(self.upper, 1):
+            nodes = np.array(sorted(links), dtype=np.int32)
+            padded = np.full((len(nodes), self.m), -1, dtype=np.int32)
+            for row, node in enumerate(nodes.tolist()):
+                padded[row, :len(links[node])] = links[node]
+            np.save(os.path.join(tmp_dir, f'layer{level}_nodes.npy'), nodes)
+            np.save(os.path.join(tmp_dir, f'layer{level}_links.npy'), padded)
+        with open(os.path.join(tmp_dir, 'metadata.jsonl'), 'w', encoding='utf-8') as f:
+            for meta in self.metadata:
+                f.write(json.dumps(meta) + '\n')
+        with open(os.path.join(tmp_dir, 'index.json'), 'w', encoding='utf-8') as f:
+            json.dump({
+                'format_version': FORMAT_VERSION,
+                'space': 'cosine',
+                'dim': self.dim,
+                'm': self.m,
+                'ef_construction': self.ef_construction,
+                'count': self.count,
+                'entry_point': self.entry_point,
+                'max_level': self.max_level,
+                'upper_levels': len(self.upper)
+            }, f, indent=2)
+        old_dir = index_dir.rstrip('/') + '.old'
+        if os.path.exists(index_dir):
+            os.replace(index_dir, old_dir)
+        os.replace(tmp_dir, index_dir)
+        if os.path.exists(old_dir):
+            shutil.rmtree(old_dir)
+        logger.info(f"Saved index with {self.count} vectors to {index_dir}")
+
+    @classmethod
+    def load(cls, index_dir, mmap=True):
+        """
+        Open a saved index. With mmap=True the vectors and level 0 links are
+        memory-mapped read-only; they are copied into memory on the first add.
+        """
+        with open(os.path.join(index_dir, 'index.json'), encoding='utf-8') as f:
+            header = json.load(f)
+        if header['format_version'] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported index format version: {header['format_version']}")
+        index = cls(header['dim'], header['m'], header['ef_construction'], seed=header['count'])
+        mmap_mode = 'r' if mmap else None
+        index.vectors = np.load(os.path.join(index_dir, 'vectors.npy'), mmap_mode=mmap_mode)
+        index.level0 = np.load(os.path.join(index_dir, 'level0.npy'), mmap_mode=mmap_mode)
+        index.levels = np.load(os.path.join(index_dir, 'levels.npy'))
+        index.count = header['count']
+        index.entry_point = header['entry_point']
+        index.max_level = header['max_level']
+        for level in range(1, header['upper_levels'] + 1):
+            nodes = np.load(os.path.join(index_dir, f'layer{level}_nodes.npy'))
+            links = np.load(os.path.join(index_dir, f'layer{level}_links.npy'))
+            index.upper.append({
+                node: row[row >= 0].tolist()
+                for node, row in zip(nodes.tolist(), links)
+            })
+        with open(os.path.join(index_dir, 'metadata.jsonl'), encoding='utf-8') as f:
+            index.metadata = [json.loads(line) for line in f]
+        index._urls = {meta['url'] for meta in index.metadata if meta and meta.get('url')}
+        return index
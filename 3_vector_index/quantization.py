@@ -0,0 +1,221 @@
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Rows decoded per block during search, to bound temporary memory
+SEARCH_BLOCK_ROWS = 65536
+
+def normalize(vectors):
+    """L2-normalize rows so inner product equals cosine similarity."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def top_k(scores, k):
+    """
+    Column ids of the k highest scores in each row, best first.
+    """
+    k = min(k, scores.shape[1])
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+def without_query(ids, query_id, k):
+    """
+    Drop a query's own id from a ranked id list and keep the top k. Used when
+    recall is measured with indexed vectors as queries, which would otherwise
+    always find themselves.
+    """
+    return [idx for idx in ids if idx != query_id][:k]
+
+def exact_search(vectors, queries, k):
+    """
+    Exact top-k ids by dot product over normalized vectors.
+    """
+    return top_k(queries @ vectors.T, k)
+
+def _blocked_search(score_block, num_codes, queries, k):
+    """
+    Run score_block(start, end) over blocks of codes and keep a running top-k.
+    """
+    best_ids = np.empty((len(queries), 0), dtype=np.int64)
+    best_scores = np.empty((len(queries), 0), dtype=np.float32)
+    for start in range(0, num_codes, SEARCH_BLOCK_ROWS):
+        end = min(start + SEARCH_BLOCK_ROWS, num_codes)
+        scores = np.concatenate([best_scores, score_block(start, end)], axis=1)
+        ids = np.concatenate([best_ids, np.broadcast_to(np.arange(start, end), (len(queries), end - start))], axis=1)
+        top = top_k(scores, k)
+        best_scores = np.take_along_axis(scores, top, axis=1)
+        best_ids = np.take_along_axis(ids, top, axis=1)
+    return best_ids, best_scores
+
+class ScalarQuantizer:
+    """
+    Per-dimension int8 quantization: each dimension is mapped linearly from
+    its trained [min, max] range onto 256 levels (1 byte per dimension).
+    """
+    def __init__(self):
+        self.offset = None
+        self.scale = None
+
+    @property
+    def code_size(self):
+        return len(self.offset)
+
+    def train(self, sample):
+        sample = normalize(sample)
+        self.offset = sample.min(axis=0)
+        self.scale = (sample.max(axis=0) - self.offset) / 255.0
+        self.scale[self.scale == 0] = 1.0
+        return self
+
+    def encode(self, vectors):
+        codes = np.rint((normalize(vectors) - self.offset) / self.scale)
+        return np.clip(codes, 0, 255).astype(np.uint8)
+
+    def decode(self, codes):
+        return codes.astype(np.float32) * self.scale + self.offset
+
+    def search(self, codes, queries, k=10):
+        """
+        Asymmetric search: float queries against int8 codes, without
+        decoding the codes back to full vectors.
+
+        Returns:
+            tuple: (ids, scores) of shape (num_queries, k)
+        """
+        queries = normalize(np.atleast_2d(queries))
+        # q . (code * scale + offset) = (q * scale) . code + q . offset
+        scaled = queries * self.scale
+        constant = (queries @ self.offset)[:, None]
+
+        def score_block(start, end):
+            return scaled @ codes[start:end].astype(np.float32).T + constant
+        return _blocked_search(score_block, len(codes), queries, k)
+
+    def save(self, path):
+        np.savez(path, kind='sq8', offset=self.offset, scale=self.scale)
+
+class ProductQuantizer:
+    """
+    Product quantization: vectors are split into num_subspaces chunks and each
+    chunk is replaced by the id of its nearest of 256 k-means centroids
+    (1 byte per subspace).
+    """
+    def __init__(self, num_subspaces=96, num_centroids=256, iterations=20, seed=0):
+        if num_centroids > 256:
+            raise ValueError("num_centroids must be at most 256 to fit in uint8 codes")
+        self.num_subspaces = num_subspaces
+        self.num_centroids = num_centroids
+        self.iterations = iterations
+        self.seed = seed
+        # (num_subspaces, num_centroids, subspace_dim)
+        self.centroids = None
+
+    @property
+    def code_size(self):
+        return self.num_subspaces
+
+    def _split(self, vectors):
+        n, dim = vectors.shape
+        return vectors.reshape(n, self.num_subspaces, dim // self.num_subspaces)
+
+    def _kmeans(self, points, rng):
+        k = min(self.num_centroids, len(points))
+        centroids = points[rng.choice(len(points), size=k, replace=False)].copy()
+        for _ in range(self.iterations):
+            assignment = self._nearest(points, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, points)
+            counts = np.bincount(assignment, minlength=k)
+            empty = counts == 0
+            centroids[~empty] = sums[~empty] / counts[~empty, None]
+            # Re-seed empty clusters from random points
+            if empty.any():
+                centroids[empty] = points[rng.choice(len(points), size=int(empty.sum()), replace=False)]
+        if k < self.num_centroids:
+            centroids = np.concatenate([centroids, np.repeat(centroids[:1], self.num_centroids - k, axis=0)])
+        return centroids
+
+    @staticmethod
+    def _nearest(points, centroids):
+        distances = (centroids ** 2).sum(axis=1) - 2.0 * points @ centroids.T
+        return distances.argmin(axis=1)
+
+    def train(self, sample):
+        sample = normalize(sample)
+        if sample.shape[1] % self.num_subspaces:
+            raise ValueError(f"Dimension {sample.shape[1]} is not divisible by {self.num_subspaces} subspaces")
+        rng = np.random.default_rng(self.seed)
+        chunks = self._split(sample)
+        self.centroids = np.stack([
+            self._kmeans(np.ascontiguousarray(chunks[:, j]), rng)
+            for j in range(self.num_subspaces)
+        ]).astype(np.float32)
+        return self
+
+    def encode(self, vectors):
+        chunks = self._split(normalize(vectors))
+        codes = np.empty((len(chunks), self.num_subspaces), dtype=np.uint8)
+        for j in range(self.num_subspaces):
+            codes[:, j] = self._nearest(chunks[:, j], self.centroids[j])
+        return codes
+
+    def decode(self, codes):
+        return self.centroids[np.arange(self.num_subspaces), codes].reshape(len(codes), -1)
+
+    def search(self, codes, queries, k=10):
+        """
+        Asymmetric distance computation: per query, a lookup table of the inner
+        product of each query chunk with every centroid, summed over the codes.
+
+        Returns:
+            tuple: (ids, scores) of shape (num_queries, k)
+        """
+        queries = normalize(np.atleast_2d(queries))
+        # (num_queries, num_subspaces, num_centroids)
+        tables = np.einsum('qjd,jcd->qjc', self._split(queries), self.centroids)
+        subspaces = range(self.num_subspaces)
+
+        def score_block(start, end):
+            block = codes[start:end]
+            scores = np.zeros((len(queries), end - start), dtype=np.float32)
+            for j in subspaces:
+                scores += tables[:, j, block[:, j]]
+            return scores
+        return _blocked_search(score_block, len(codes), queries, k)
+
+    def save(self, path):
+        np.savez(path, kind='pq', centroids=self.centroids, iterations=self.iterations, seed=self.seed)
+
+def rerank(candidate_ids, vectors, queries, k=10):
+    """
+    Re-score a shortlist from a quantized search with the exact vectors
+    (typically a memory-mapped float32 matrix that stays on disk).
+
+    Returns:
+        tuple: (ids, scores) of shape (num_queries, k)
+    """
+    queries = normalize(np.atleast_2d(queries))
+    scores = np.einsum('qd,qcd->qc', queries, np.asarray(vectors[candidate_ids.ravel()]).reshape(
+        candidate_ids.shape + (queries.shape[1],)))
+    top = top_k(scores, k)
+    return np.take_along_axis(candidate_ids, top, axis=1), np.take_along_axis(scores, top, axis=1)
+
+def load_quantizer(path):
+    """Load a quantizer saved with save()."""
+    data = np.load(path)
+    kind = str(data['kind'])
+    if kind == 'sq8':
+        quantizer = ScalarQuantizer()
+        quantizer.offset = data['offset']
+        quantizer.scale = data['scale']
+        return quantizer
+    if kind == 'pq':
+        centroids = data['centroids']
+        quantizer = ProductQuantizer(centroids.shape[0], centroids.shape[1], int(data['iterations']), int(data['seed']))
+        quantizer.centroids = centroids
+        return quantizer
+    raise ValueError(f"Unknown quantizer kind: {kind}")
@@ -0,0 +1,149 @@
+import os
+import io
+import csv
+import json
+import base64
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Metadata kept next to each vector; missing columns are stored as None
+META_COLUMNS = ['url', 'title', 'domain', 'language', 'scrape_date', 'sentiment']
+EMBEDDING_DTYPES = {'base64-float32': '<f4', 'base64-float16': '<f2'}
+PARQUET_MAGIC = b'PAR1'
+
+def parse_s3_uri(s3_uri):
+    """Parse an S3 URI into bucket and key."""
+    if not s3_uri.startswith('s3://'):
+        raise ValueError('Invalid S3 URI')
+    parts = s3_uri[5:].split('/', 1)
+    bucket = parts[0]
+    key = parts[1] if len(parts) > 1 else ''
+    return bucket, key
+
+def _iter_s3_objects(s3_uri):
+    import boto3
+    s3 = boto3.client('s3')
+    bucket, prefix = parse_s3_uri(s3_uri)
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            if obj['Key'].endswith('/'):
+                continue
+            logger.info(f"Reading s3://{bucket}/{obj['Key']}")
+            yield s3.get_object(Bucket=bucket, Key=obj['Key'])['Body'].read()
+
+def _iter_local_files(path):
+    if os.path.isfile(path):
+        paths = [path]
+    else:
+        paths = sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(path)
+            for name in names
+        )
+    for file_path in paths:
+        logger.info(f"Reading {file_path}")
+        with open(file_path, 'rb') as f:
+            yield f.read()
+
+def iter_output_objects(path):
+    """
+    Yield the raw bytes of every transform output object under a local
+    file/directory or an s3://bucket/prefix.
+    """
+    if path.startswith('s3://'):
+        return _iter_s3_objects(path)
+    return _iter_local_files(path)
+
+def decode_embedding(value, encoding=None):
+    """
+    Decode an embedding written by output_fn in any of its encodings.
+
+    Args:
+        value: list of floats, JSON list string or base64 string
+        encoding (str): value of the 'embedding_encoding' column, if any
+
+    Returns:
+        np.ndarray: float32 vector, or None if the row has no embedding
+    """
+    if value is None or (isinstance(value, (str, list)) and len(value) == 0):
+        return None
+    if isinstance(value, str):
+        if encoding in EMBEDDING_DTYPES:
+            value = np.frombuffer(base64.b64decode(value), dtype=EMBEDDING_DTYPES[encoding])
+        else:
+            value = json.loads(value)
+    return np.asarray(value, dtype=np.float32)
+
+def _iter_parquet_rows(data):
+    import pyarrow.parquet as pq
+    table = pq.read_table(io.BytesIO(data))
+    columns = [col for col in META_COLUMNS if col in table.column_names]
+    embeddings = table.column('embedding').combine_chunks()
+    metadata = {col: table.column(col).to_pylist() for col in columns}
+    for idx in range(table.num_rows):
+        embedding = embeddings[idx].values
+        row = {col: metadata[col][idx] for col in columns}
+        row['embedding'] = None if embedding is None else embedding.to_numpy(zero_copy_only=False)
+        yield row
+
+def _iter_text_rows(data):
+    text = data.decode('utf-8')
+    stripped = text.lstrip()
+    if stripped.startswith('[') or stripped.startswith('{'):
+        # JSON Lines, or one JSON array per response when assembled by line
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            parsed = json.loads(line)
+            if isinstance(parsed, list):
+                yield from parsed
+            else:
+                yield parsed
+        return
+    for row in csv.DictReader(io.StringIO(text, newline='')):
+        # Responses assembled by line repeat the header row
+        if row.get('url') == 'url':
+            continue
+        yield row
+
+def iter_records(path):
+    """
+    Yield (metadata, embedding) for every transform output row that has an
+    embedding. Handles JSON, JSON Lines, CSV and Parquet output.
+
+    Args:
+        path (str): Local file/directory or s3://bucket/prefix
+
+    Yields:
+        tuple: (dict of META_COLUMNS, float32 np.ndarray)
+    """
+    skipped = 0
+    for data in iter_output_objects(path):
+        rows = _iter_parquet_rows(data) if data[:4] == PARQUET_MAGIC else _iter_text_rows(data)
+        for row in rows:
+            embedding = decode_embedding(row.get('embedding'), row.get('embedding_encoding'))
+            if embedding is None:
+                skipped += 1
+                continue
+            yield {col: row.get(col) for col in META_COLUMNS}, embedding
+    if skipped:
+        logger.info(f"Skipped {skipped} rows without an embedding")
+
+def load_embeddings(path):
+    """
+    Load all transform output rows with an embedding.
+
+    Returns:
+        tuple: (list of metadata dicts, float32 matrix of shape (n, dim))
+    """
+    metadata = []
+    vectors = []
+    for meta, embedding in iter_records(path):
+        metadata.append(meta)
+        vectors.append(embedding)
+    if not vectors:
+        return metadata, np.empty((0, 0), dtype=np.float32)
+    return metadata, np.vstack(vectors)
@@ -0,0 +1,366 @@
+import os
+import io
+import re
+import csv
+import sys
+import json
+import time
+import hashlib
+import argparse
+import queue
+import platform
+import subprocess
+import importlib.util
+import multiprocessing
+from collections import Counter
+import numpy as np
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(SCRIPT_DIR)
+
+# Bump when the corpus generation below changes, so results are only compared like for like
+CORPUS_VERSION = 1
+CORPUS_SOURCE = os.path.join(SCRIPT_DIR, 'input', 'test_input.csv')
+CSV_COLUMNS = ['url', 'title', 'language', 'domain', 'warc_file', 'scrape_date', 'content']
+
+# The three predict_fn implementations in the repo. The 2_sagemaker_batch_job
+# versions read str bodies and only write JSON.
+IMPLEMENTATIONS = {
+    'sagemaker_scripts': {
+        'path': os.path.join(SCRIPT_DIR, 'inference.py'),
+        'accept': 'application/jsonlines',
+        'body': 'bytes'
+    },
+    'batch_inference': {
+        'path': os.path.join(REPO_DIR, '2_sagemaker_batch_job', 'batch_inference.py'),
+        'accept': 'application/json',
+        'body': 'str'
+    },
+    'batch_job_inference': {
+        'path': os.path.join(REPO_DIR, '2_sagemaker_batch_job', 'inference.py'),
+        'accept': 'application/json',
+        'body': 'str'
+    }
+}
+
+# Tiny checkpoints for CPU-only runs: (hub id, directory names used by the implementations)
+TINY_MODELS = {
+    'summarization': ('sshleifer/bart-tiny-random', ['summarization', 'summarization_model']),
+    'sentiment': ('sshleifer/tiny-distilbert-base-uncased-finetuned-sst-2-english', ['sentiment', 'sentiment_model'])
+}
+
+class StubBedrockClient:
+    """
+    Deterministic stand-in for the bedrock-runtime client: sleeps for the
+    configured latency and returns an embedding seeded by the input text.
+    """
+    def __init__(self, latency_ms=0.0, dim=1536):
+        self.latency = latency_ms / 1000.0
+        self.dim = dim
+        self.calls = 0
+
+    def invoke_model(self, body, **kwargs):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        text = json.loads(body)['inputText']
+        seed = int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], 'little')
+        embedding = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+        return {'body': io.BytesIO(json.dumps({'embedding': embedding.tolist()}).encode('utf-8'))}
+
+def build_corpus(num_articles, mean_chars, sigma, min_chars, max_chars, seed=0):
+    """
+    Build a deterministic corpus from the sentences of the sample articles,
+    with article lengths drawn from a clipped log-normal distribution.
+
+    Returns:
+        list: dicts with the CSV_COLUMNS
+    """
+    with open(CORPUS_SOURCE, encoding='utf-8') as f:
+        source = [row['content'] for row in csv.DictReader(f)]
+    sentences = [s.strip() for text in source for s in re.split(r'(?<=[.!?])\s+', text) if s.strip()]
+    rng = np.random.default_rng(seed)
+    lengths = np.clip(rng.lognormal(np.log(mean_chars), sigma, num_articles), min_chars, max_chars).astype(int)
+    corpus = []
+    for idx, length in enumerate(lengths):
+        position = int(rng.integers(len(sentences)))
+        parts = []
+        total = 0
+        while total < length:
+            sentence = sentences[position % len(sentences)]
+            parts.append(sentence)
+            total += len(sentence) + 1
+            position += 1
+        corpus.append({
+            'url': f'https://benchmark.local/v{CORPUS_VERSION}/{idx}',
+            'title': parts[0][:80],
+            'language': 'en',
+            'domain': 'benchmark_local',
+            'warc_file': 'benchmark.warc.gz',
+            'scrape_date': '2021-09-25T00:00:00Z',
+            'content': ' '.join(parts)[:length]
+        })
+    return corpus
+
+def load_corpus(path):
+    with open(path, encoding='utf-8', newline='') as f:
+        return list(csv.DictReader(f))
+
+def to_requests(corpus, rows_per_request):
+    """Split the corpus into CSV request bodies with a header row each."""
+    requests = []
+    for start in range(0, len(corpus), rows_per_request):
+        output = io.StringIO()
+        writer = csv.DictWriter(output, fieldnames=CSV_COLUMNS)
+        writer.writeheader()
+        writer.writerows(corpus[start:start + rows_per_request])
+        requests.append(output.getvalue())
+    return requests
+
+def prepare_tiny_models(model_dir):
+    """
+    Download the tiny test checkpoints into every directory name the
+    implementations look for.
+    """
+    from transformers import AutoModelForSeq2SeqLM, AutoModelForSequenceClassification, AutoTokenizer
+    model_classes = {'summarization': AutoModelForSeq2SeqLM, 'sentiment': AutoModelForSequenceClassification}
+    for task, (model_id, dir_names) in TINY_MODELS.items():
+        model = model_classes[task].from_pretrained(model_id)
+        tokenizer = AutoTokenizer.from_pretrained(model_id)
+        for dir_name in dir_names:
+            path = os.path.join(model_dir, dir_name)
+            model.save_pretrained(path)
+            tokenizer.save_pretrained(path)
+            print(f"Saved {model_id} to {path}")
+
+def peak_rss_mb():
+    """
+    Peak resident memory of the current process in MB, or None when it cannot
+    be measured. resource is Unix-only; on Windows psutil is used if installed.
+    """
+    try:
+        import resource
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        scale = 1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    except ImportError:
+        pass
+    try:
+        import psutil
+        memory = psutil.Process().memory_info()
+        return getattr(memory, 'peak_wset', memory.rss) / (1024.0 * 1024.0)
+    except ImportError:
+        return None
+
+def percentiles(values):
+    values = np.asarray(values) * 1000.0
+    return {
+        'p50_ms': float(np.percentile(values, 50)),
+        'p95_ms': float(np.percentile(values, 95)),
+        'p99_ms': float(np.percentile(values, 99)),
+        'mean_ms': float(values.mean())
+    }
+
+def _load_module(name, path):
+    sys.path.insert(0, os.path.dirname(path))
+    spec = importlib.util.spec_from_file_location(f'benchmark_{name}', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def run_implementation(name, model_dir, requests, bedrock_latency_ms, warmup, result_queue):
+    """
+    Run model_fn once, then every request through input_fn -> predict_fn ->
+    output_fn, timing each stage. Lazy stage results are materialized so each
+    stage's cost is attributed to it. Runs in its own process so the peak RSS
+    belongs to this implementation alone. For implementations that route rows,
+    the route counts of the measured requests are reported too.
+    """
+    try:
+        spec = IMPLEMENTATIONS[name]
+        module = _load_module(name, spec['path'])
+        start = time.perf_counter()
+        model_dict = module.model_fn(model_dir)
+        load_seconds = time.perf_counter() - start
+        model_dict['bedrock_client'] = StubBedrockClient(bedrock_latency_ms)
+
+        stages = {'input_fn': [], 'predict_fn': [], 'output_fn': [], 'total': []}
+        rows = 0
+        elapsed = 0.0
+        route_totals = getattr(module, 'route_totals', None)
+        routes_before = Counter()
+        for idx, request in enumerate(requests[:warmup] + requests):
+            if idx == warmup and route_totals is not None:
+                routes_before = Counter(route_totals)
+            body = request.encode('utf-8') if spec['body'] == 'bytes' else request
+            t0 = time.perf_counter()
+            data = module.input_fn(body, 'text/csv')
+            data = data if isinstance(data, list) else list(data)
+            t1 = time.perf_counter()
+            predictions = module.predict_fn(data, model_dict)
+            predictions = predictions if isinstance(predictions, list) else list(predictions)
+            t2 = time.perf_counter()
+            module.output_fn(predictions, spec['accept'])
+            t3 = time.perf_counter()
+            if idx < warmup:
+                continue
+            stages['input_fn'].append(t1 - t0)
+            stages['predict_fn'].append(t2 - t1)
+            stages['output_fn'].append(t3 - t2)
+            stages['total'].append(t3 - t0)
+            rows += len(data)
+            elapsed += t3 - t0
+        routes = None
+        if route_totals is not None:
+            routes = {f"{route}/{reason}": count for (route, reason), count in
+                      sorted((route_totals - routes_before).items())}
+        result_queue.put({
+            'implementation': name,
+            'model_load_seconds': load_seconds,
+            'requests': len(requests),
+            'rows': rows,
+            'rows_per_second': rows / elapsed if elapsed else 0.0,
+            'peak_rss_mb': peak_rss_mb(),
+            'stages': {stage: percentiles(values) for stage, values in stages.items() if values},
+            'routes': routes
+        })
+    except Exception as e:
+        result_queue.put({'implementation': name, 'error': f"{type(e).__name__}: {e}"})
+
+def wait_for_result(name, process, result_queue, timeout):
+    """
+    Wait for the result of a benchmark process. Returns an error result if
+    the process exits without reporting (e.g. killed for running out of
+    memory) or runs longer than timeout seconds.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            return result_queue.get(timeout=1)
+        except queue.Empty:
+            if not process.is_alive():
+                try:
+                    return result_queue.get(timeout=1)
+                except queue.Empty:
+                    return {'implementation': name, 'error': f"process exited with code {process.exitcode}"}
+    process.terminate()
+    return {'implementation': name, 'error': f"timed out after {timeout}s"}
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=REPO_DIR, text=True).strip()
+    except Exception:
+        return None
+
+def print_results(results, baseline=None):
+    baseline_by_name = {r['implementation']: r for r in (baseline or {}).get('results', [])}
+    for result in results:
+        name = result['implementation']
+        if 'error' in result:
+            print(f"\n{name}: FAILED ({result['error']})")
+            continue
+        peak_rss = 'n/a' if result['peak_rss_mb'] is None else f"{result['peak_rss_mb']:.0f} MB"
+        print(f"\n{name}: {result['rows_per_second']:.2f} rows/s, model load {result['model_load_seconds']:.1f}s, "
+              f"peak RSS {peak_rss}")
+        print(f"{'stage':>12} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+        for stage, stats in result['stages'].items():
+            print(f"{stage:>12} {stats['p50_ms']:>10.2f} {stats['p95_ms']:>10.2f} {stats['p99_ms']:>10.2f}")
+        if result.get('routes'):
+            print(f"  routes: {', '.join(f'{route}={count}' for route, count in result['routes'].items())}")
+        previous = baseline_by_name.get(name)
+        if previous and 'error' not in previous and previous.get('rows_per_second'):
+            change = 100.0 * (result['rows_per_second'] / previous['rows_per_second'] - 1.0)
+            p95_change = 100.0 * (result['stages']['total']['p95_ms'] / previous['stages']['total']['p95_ms'] - 1.0)
+            rss_change = ''
+            if result['peak_rss_mb'] is not None and previous.get('peak_rss_mb') is not None:
+                rss_change = f", peak RSS {result['peak_rss_mb'] - previous['peak_rss_mb']:+.0f} MB"
+            print(f"  vs baseline: throughput {change:+.1f}%, total p95 {p95_change:+.1f}%{rss_change}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of model_fn/input_fn/predict_fn/output_fn")
+    parser.add_argument("--model-dir", default="models")
+    parser.add_argument("--prepare-tiny-models", action="store_true",
+                        help="Download tiny test checkpoints into --model-dir before running")
+    parser.add_argument("--implementations", default=','.join(IMPLEMENTATIONS))
+    parser.add_argument("--corpus", help="CSV corpus to use instead of the generated one")
+    parser.add_argument("--write-corpus", help="Save the generated corpus to this CSV path")
+    parser.add_argument("--articles", type=int, default=64)
+    parser.add_argument("--mean-chars", type=int, default=3000, help="Median article length of the generated corpus")
+    parser.add_argument("--length-sigma", type=float, default=0.8, help="Log-normal sigma of article lengths")
+    parser.add_argument("--min-chars", type=int, default=200)
+    parser.add_argument("--max-chars", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rows-per-request", type=int, default=8)
+    parser.add_argument("--warmup-requests", type=int, default=1)
+    parser.add_argument("--bedrock-latency-ms", type=float, default=50.0)
+    parser.add_argument("--routing", action="store_true",
+                        help="Enable routing in sagemaker_scripts/inference.py; skipped rows then count towards throughput")
+    parser.add_argument("--timeout", type=float, default=3600, help="Seconds allowed per implementation")
+    parser.add_argument("--output", default="output/benchmark_results.json")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    args = parser.parse_args()
+
+    if args.prepare_tiny_models:
+        prepare_tiny_models(args.model_dir)
+    if args.corpus:
+        corpus = load_corpus(args.corpus)
+        corpus_info = {'path': args.corpus, 'articles': len(corpus)}
+    else:
+        corpus = build_corpus(args.articles, args.mean_chars, args.length_sigma, args.min_chars, args.max_chars, args.seed)
+        corpus_info = {
+            'version': CORPUS_VERSION, 'articles': args.articles, 'mean_chars': args.mean_chars,
+            'length_sigma': args.length_sigma, 'min_chars': args.min_chars, 'max_chars': args.max_chars,
+            'seed': args.seed
+        }
+        if args.write_corpus:
+            with open(args.write_corpus, 'w', encoding='utf-8', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS)
+                writer.writeheader()
+                writer.writerows(corpus)
+    requests = to_requests(corpus, args.rows_per_request)
+
+    # The stub client is injected in-process, so keep inference in this process
+    os.environ['INFERENCE_WORKERS'] = '1'
+    # Only sagemaker_scripts/inference.py routes rows; the other handlers run every
+    # row through the models, so routing is off unless asked for
+    os.environ['ROUTING_ENABLED'] = 'true' if args.routing else 'false'
+    ctx = multiprocessing.get_context('spawn')
+    results = []
+    for name in [n.strip() for n in args.implementations.split(',') if n.strip()]:
+        if name not in IMPLEMENTATIONS:
+            parser.error(f"Unknown implementation: {name}")
+        print(f"Running {name} ...")
+        result_queue = ctx.Queue()
+        process = ctx.Process(target=run_implementation, args=(
+            name, args.model_dir, requests, args.bedrock_latency_ms, args.warmup_requests, result_queue))
+        process.start()
+        result = wait_for_result(name, process, result_queue, args.timeout)
+        process.join()
+        results.append(result)
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'git_commit': git_commit(),
+        'platform': {'python': platform.python_version(), 'machine': platform.machine(), 'cpus': os.cpu_count()},
+        'corpus': corpus_info,
+        'config': {
+            'rows_per_request': args.rows_per_request,
+            'warmup_requests': args.warmup_requests,
+            'bedrock_latency_ms': args.bedrock_latency_ms,
+            'routing': args.routing,
+            'model_dir': args.model_dir
+        },
+        'results': results
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved results to {args.output}")
+
+if __name__ == "__main__":
+    main()
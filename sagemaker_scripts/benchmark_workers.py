@@ -0,0 +1,63 @@
+import argparse
+import itertools
+import time
+import inference
+
+def parse_int_list(value):
+    return [int(v) for v in value.split(',') if v.strip()]
+
+def run_config(model_dir, request_body, num_workers, threads_per_worker, repeat):
+    """
+    Start a worker pool and time input_fn -> predict_fn -> output_fn on the request.
+    """
+    start = time.time()
+    pool = inference.start_worker_pool(model_dir, num_workers, threads_per_worker)
+    load_seconds = time.time() - start
+    model_dict = {"worker_pool": pool}
+    try:
+        rows = 0
+        start = time.time()
+        for _ in range(repeat):
+            output = inference.output_fn(
+                inference.predict_fn(inference.input_fn(request_body, 'text/csv'), model_dict),
+                'application/jsonlines'
+            )
+            rows += output.count('\n')
+        elapsed = time.time() - start
+    finally:
+        pool.close()
+        pool.join()
+    return {
+        "workers": num_workers,
+        "threads_per_worker": threads_per_worker,
+        "load_seconds": load_seconds,
+        "rows": rows,
+        "seconds": elapsed,
+        "rows_per_second": rows / elapsed if elapsed else 0.0
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep inference worker count against threads per worker")
+    parser.add_argument("--model-dir", default="models")
+    parser.add_argument("--input", default="input/test_input.csv")
+    parser.add_argument("--workers", default="1,2,4", help="Comma separated worker counts")
+    parser.add_argument("--threads", default="1,2,4", help="Comma separated threads per worker")
+    parser.add_argument("--repeat", type=int, default=3, help="Times the input is sent per configuration")
+    parser.add_argument("--allow-oversubscription", action="store_true",
+                        help="Also run configurations that use more threads than available cores")
+    args = parser.parse_args()
+
+    with open(args.input, "rb") as f:
+        request_body = f.read()
+    cores = len(inference._available_cores())
+    print(f"Available cores: {cores}")
+    print(f"{'workers':>8} {'threads':>8} {'load s':>8} {'rows':>6} {'rows/s':>8}")
+    for num_workers, threads_per_worker in itertools.product(parse_int_list(args.workers), parse_int_list(args.threads)):
+        if num_workers * threads_per_worker > cores and not args.allow_oversubscription:
+            continue
+        result = run_config(args.model_dir, request_body, num_workers, threads_per_worker, args.repeat)
+        print(f"{result['workers']:>8} {result['threads_per_worker']:>8} {result['load_seconds']:>8.1f} "
+              f"{result['rows']:>6} {result['rows_per_second']:>8.2f}")
+
+if __name__ == "__main__":
+    main()
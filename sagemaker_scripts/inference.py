@@ -5,7 +5,12 @@ import boto3
 import torch
 import csv
 import io
-import copy
+import itertools
+import base64
+import multiprocessing
+import re
+from collections import Counter, deque
+import numpy as np
 from transformers import (
     AutoModelForSequenceClassification,
     AutoModelForSeq2SeqLM,
@@ -17,6 +22,70 @@ from transformers import (
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Columns written by the Fargate task to Firehose, in order
+INPUT_COLUMNS = ['url', 'title', 'language', 'domain', 'warc_file', 'scrape_date', 'content']
+PREDICTION_COLUMNS = ['summary', 'sentiment', 'sentiment_score', 'embedding', 'route', 'route_reason']
+# Columns returned by predict_fn; 'content' is dropped unless explicitly requested
+OUTPUT_COLUMNS = [
+    col.strip() for col in os.environ.get(
+        'OUTPUT_COLUMNS',
+        ','.join([col for col in INPUT_COLUMNS if col != 'content'] + PREDICTION_COLUMNS)
+    ).split(',') if col.strip()
+]
+JSONLINES_CONTENT_TYPES = ('application/jsonlines', 'application/x-jsonlines')
+PARQUET_CONTENT_TYPES = ('application/x-parquet', 'application/vnd.apache.parquet')
+# How embeddings are serialized: 'list' (JSON number list), 'float32' or 'float16'.
+# The binary encodings are written as base64 in CSV/JSON and as a fixed-size
+# list column in Parquet; the encoding is recorded in the 'embedding_encoding'
+# column (or the Parquet schema metadata).
+EMBEDDING_ENCODING = os.environ.get('EMBEDDING_ENCODING', 'list').lower()
+EMBEDDING_DTYPES = {'float32': np.float32, 'float16': np.float16}
+DEFAULT_EMBEDDING_DIM = 1536  # amazon.titan-embed-text-v1
+if EMBEDDING_ENCODING != 'list' and EMBEDDING_ENCODING not in EMBEDDING_DTYPES:
+    logger.warning(f"Unsupported EMBEDDING_ENCODING: {EMBEDDING_ENCODING}, defaulting to list")
+    EMBEDDING_ENCODING = 'list'
+# Worker-pool mode: run INFERENCE_WORKERS model replicas in separate processes,
+# each limited to INFERENCE_THREADS_PER_WORKER torch threads (default: an even
+# share of the available cores) and pinned to its own cores where supported.
+INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', '1'))
+INFERENCE_THREADS_PER_WORKER = int(os.environ.get('INFERENCE_THREADS_PER_WORKER', '0'))
+INFERENCE_CHUNK_SIZE = int(os.environ.get('INFERENCE_CHUNK_SIZE', '4'))
+WORKER_START_TIMEOUT = int(os.environ.get('WORKER_START_TIMEOUT', '600'))
+# Chunks parsed and queued ahead of the results being consumed, so only a few
+# chunks per worker are held in memory at a time
+INFERENCE_MAX_CHUNKS_IN_FLIGHT = int(os.environ.get(
+    'INFERENCE_MAX_CHUNKS_IN_FLIGHT', str(2 * max(INFERENCE_WORKERS, 1))))
+
+# Routing ahead of the models. Each row is sent through the full pipeline
+# (summary, sentiment, embedding), embedded only, or skipped, with a reason code.
+ROUTE_FULL = 'full'
+ROUTE_EMBED_ONLY = 'embed_only'
+ROUTE_SKIP = 'skip'
+ROUTING_ENABLED = os.environ.get('ROUTING_ENABLED', 'true').lower() == 'true'
+# Languages the English-only summarization/sentiment models are run on
+ROUTE_FULL_LANGUAGES = set(os.environ.get('ROUTE_FULL_LANGUAGES', 'en').split(','))
+# Other languages that are still embedded; '*' means any detected language
+ROUTE_EMBED_LANGUAGES = set(os.environ.get('ROUTE_EMBED_LANGUAGES', '*').split(','))
+ROUTE_MIN_CONTENT_CHARS = int(os.environ.get('ROUTE_MIN_CONTENT_CHARS', '200'))
+ROUTE_MIN_ALPHA_RATIO = float(os.environ.get('ROUTE_MIN_ALPHA_RATIO', '0.6'))
+ROUTE_MIN_UNIQUE_WORD_RATIO = float(os.environ.get('ROUTE_MIN_UNIQUE_WORD_RATIO', '0.2'))
+ROUTE_MAX_WORDS_PER_SENTENCE = float(os.environ.get('ROUTE_MAX_WORDS_PER_SENTENCE', '100'))
+# Embed-only rows have no summary, so a prefix of the content is embedded instead
+EMBED_ONLY_MAX_CHARS = int(os.environ.get('EMBED_ONLY_MAX_CHARS', '2048'))
+SENTENCE_END_PATTERN = re.compile(r'[.!?\u3002\uff01\uff1f]')
+
+# Route counts for every row seen by this process, i.e. for the whole transform job on this instance
+route_totals = Counter()
+
+# Models loaded inside a pool worker process
+_worker_models = None
+
+class InputParseError(ValueError):
+    """
+    Raised while the lazily parsed request rows are consumed. output_fn lets it
+    propagate so a malformed request fails instead of returning an empty result.
+    """
+
 def model_fn(model_dir):
     """
     Load the models for inference
@@ -25,7 +94,79 @@ def model_fn(model_dir):
         model_dir (str): Directory where model artifacts are stored
     
     Returns:
-        dict: Dictionary containing loaded models and clients
+        dict: Dictionary containing loaded models and clients, or the
+        worker pool when INFERENCE_WORKERS > 1
+    """
+    if INFERENCE_WORKERS > 1:
+        return {"worker_pool": start_worker_pool(model_dir, INFERENCE_WORKERS, INFERENCE_THREADS_PER_WORKER)}
+    if INFERENCE_THREADS_PER_WORKER > 0:
+        torch.set_num_threads(INFERENCE_THREADS_PER_WORKER)
+    return _load_models(model_dir)
+
+def _available_cores():
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def _init_worker(model_dir, num_workers, threads_per_worker, worker_counter, start_barrier):
+    """
+    Pool initializer: pin the worker to its share of the cores, limit torch
+    threading and load a model replica.
+    """
+    global _worker_models
+    with worker_counter.get_lock():
+        worker_idx = worker_counter.value
+        worker_counter.value += 1
+    # A worker that replaces a crashed one reuses that slot's cores
+    slot = worker_idx % num_workers
+    cores = _available_cores()
+    worker_cores = cores[slot * threads_per_worker:(slot + 1) * threads_per_worker]
+    if worker_cores and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, worker_cores)
+    torch.set_num_threads(threads_per_worker)
+    torch.set_num_interop_threads(1)
+    logger.info(f"Worker {worker_idx} (pid {os.getpid()}) using {threads_per_worker} threads on cores {worker_cores}")
+    _worker_models = _load_models(model_dir)
+    if worker_idx < num_workers:
+        start_barrier.wait()
+
+def start_worker_pool(model_dir, num_workers, threads_per_worker=0):
+    """
+    Start num_workers model replicas in spawned processes and wait until
+    every replica has loaded its models.
+    
+    Args:
+        model_dir (str): Directory where model artifacts are stored
+        num_workers (int): Number of worker processes
+        threads_per_worker (int): torch threads per worker; 0 splits the
+            available cores evenly
+    
+    Returns:
+        multiprocessing.pool.Pool: Pool used by predict_fn
+    """
+    if threads_per_worker <= 0:
+        threads_per_worker = max(1, len(_available_cores()) // num_workers)
+    logger.info(f"Starting {num_workers} inference workers with {threads_per_worker} threads each")
+    # Forking a process that already initialized torch thread pools can deadlock
+    ctx = multiprocessing.get_context('spawn')
+    worker_counter = ctx.Value('i', 0)
+    start_barrier = ctx.Barrier(num_workers + 1)
+    pool = ctx.Pool(
+        num_workers,
+        initializer=_init_worker,
+        initargs=(model_dir, num_workers, threads_per_worker, worker_counter, start_barrier)
+    )
+    try:
+        start_barrier.wait(timeout=WORKER_START_TIMEOUT)
+    except Exception:
+        pool.terminate()
+        raise RuntimeError(f"Inference workers failed to start within {WORKER_START_TIMEOUT}s")
+    logger.info("Inference workers started")
+    return pool
+
+def _load_models(model_dir):
+    """
+    Load the summarization and sentiment pipelines and the Bedrock client.
     """
     logger.info(f"Loading models from {model_dir}")
     
@@ -94,130 +235,408 @@ def model_fn(model_dir):
         "bedrock_client": bedrock_runtime_client
     }
 
+def _open_csv_stream(request_body):
+    """
+    Wrap the request body in a text stream without decoding it up front.
+    io.BytesIO shares the buffer of an immutable bytes object, so the article
+    text is only ever decoded one row at a time.
+    """
+    if isinstance(request_body, (bytes, bytearray, memoryview)):
+        return io.TextIOWrapper(io.BytesIO(request_body), encoding='utf-8', newline='')
+    return io.StringIO(request_body, newline='')
+
+def _iter_csv_rows(request_body):
+    """
+    Return an iterator of dicts over the CSV rows.
+    The header is validated eagerly; rows are parsed lazily. Firehose writes
+    objects without a header line, so a first row that names none of the
+    INPUT_COLUMNS is treated as data and INPUT_COLUMNS is used as the field names.
+    """
+    reader = csv.reader(_open_csv_stream(request_body))
+    first_row = next(reader, None)
+    if first_row is None:
+        return iter(())
+    if set(first_row) & set(INPUT_COLUMNS):
+        missing = [col for col in INPUT_COLUMNS if col not in first_row]
+        if missing:
+            logger.error(f"Missing required column: {missing[0]}")
+            raise ValueError(f"Input CSV is missing required column: {missing[0]}")
+        return _parse_rows(reader, first_row)
+    return _parse_rows(itertools.chain([first_row], reader), INPUT_COLUMNS)
+
+def _parse_rows(rows, fieldnames):
+    """
+    Yield a dict per row. Rows with the wrong number of fields are skipped;
+    decode and CSV errors are re-raised as InputParseError.
+    """
+    try:
+        for line, row in enumerate(rows, 1):
+            if len(row) != len(fieldnames):
+                logger.warning(f"Skipping row {line} with {len(row)} fields (expected {len(fieldnames)})")
+                continue
+            yield dict(zip(fieldnames, row))
+    except (UnicodeDecodeError, csv.Error) as e:
+        logger.error(f"Error parsing CSV data: {str(e)}")
+        raise InputParseError(f"Error parsing CSV data: {str(e)}")
+
 def input_fn(request_body, request_content_type):
     """
-    Parse input data from CSV into a list of dicts.
+    Parse input data from CSV into an iterator of dicts, one row at a time.
     """
     logger.info(f"Received request with content type: {request_content_type}")
     if request_content_type == 'text/csv':
         try:
-            csv_data = io.StringIO(request_body.decode('utf-8') if isinstance(request_body, bytes) else request_body)
-            reader = csv.DictReader(csv_data)
-            data = [row for row in reader]
-            required_columns = ['url', 'title', 'language', 'domain', 'warc_file', 'scrape_date', 'content']
-            for row in data:
-                for col in required_columns:
-                    if col not in row:
-                        logger.error(f"Missing required column: {col}")
-                        raise ValueError(f"Input CSV is missing required column: {col}")
-            return data
+            return _iter_csv_rows(request_body)
         except Exception as e:
             logger.error(f"Error parsing CSV data: {str(e)}")
             raise ValueError(f"Error parsing CSV data: {str(e)}")
     else:
         raise ValueError(f"Unsupported content type: {request_content_type}. Supported type is text/csv")
 
-def predict_fn(input_data, model_dict):
+def quality_scores(content):
     """
-    Process the input data (list of dicts) and generate predictions
+    Cheap text quality signals used for routing.
+    
+    Args:
+        content (str): Article text
+    
+    Returns:
+        dict: alpha_ratio (letters over non-space characters),
+        unique_word_ratio (distinct over total words) and
+        words_per_sentence (words over sentence terminators)
     """
-    logger.info(f"Processing {len(input_data)} records")
+    non_space = sum(1 for ch in content if not ch.isspace())
+    alpha = sum(1 for ch in content if ch.isalpha())
+    words = content.lower().split()
+    sentences = len(SENTENCE_END_PATTERN.findall(content))
+    return {
+        "alpha_ratio": alpha / non_space if non_space else 0.0,
+        "unique_word_ratio": len(set(words)) / len(words) if words else 0.0,
+        "words_per_sentence": len(words) / max(sentences, 1)
+    }
+
+def route_row(row):
+    """
+    Decide how a row is processed based on its language, content length
+    and quality scores.
+    
+    Returns:
+        tuple: (route, reason) where route is ROUTE_FULL, ROUTE_EMBED_ONLY or
+        ROUTE_SKIP and reason is a short reason code
+    """
+    content = row.get('content', '')
+    if not isinstance(content, str) or not content.strip():
+        return ROUTE_SKIP, 'empty_content'
+    if not ROUTING_ENABLED:
+        return ROUTE_FULL, 'routing_disabled'
+    content = content.strip()
+    if len(content) < ROUTE_MIN_CONTENT_CHARS:
+        return ROUTE_SKIP, 'too_short'
+    scores = quality_scores(content)
+    if scores['alpha_ratio'] < ROUTE_MIN_ALPHA_RATIO:
+        return ROUTE_SKIP, 'low_alpha_ratio'
+    if scores['unique_word_ratio'] < ROUTE_MIN_UNIQUE_WORD_RATIO:
+        return ROUTE_SKIP, 'repetitive_text'
+    if scores['words_per_sentence'] > ROUTE_MAX_WORDS_PER_SENTENCE:
+        # Typical of the BeautifulSoup fallback: menus and link lists without sentences
+        return ROUTE_SKIP, 'no_sentences'
+    language = (row.get('language') or 'unknown').lower()
+    if language in ROUTE_FULL_LANGUAGES:
+        return ROUTE_FULL, 'ok'
+    if language == 'unknown':
+        return ROUTE_SKIP, 'unknown_language'
+    if '*' in ROUTE_EMBED_LANGUAGES or language in ROUTE_EMBED_LANGUAGES:
+        return ROUTE_EMBED_ONLY, 'unsupported_language'
+    return ROUTE_SKIP, 'unsupported_language'
+
+def _embed(bedrock_client, text):
+    model_id = "amazon.titan-embed-text-v1"
+    request_body = json.dumps({
+        "inputText": text
+    })
+    response = bedrock_client.invoke_model(
+        modelId=model_id,
+        contentType="application/json",
+        accept="application/json",
+        body=request_body
+    )
+    response_body = json.loads(response.get("body").read())
+    return response_body.get("embedding")
+
+def _predict_row(idx, row, route, reason, summarizer, sentiment_analyzer, bedrock_client):
+    """
+    Run the models selected by the route for a single row and return only
+    the OUTPUT_COLUMNS.
+    """
+    result = {col: row.get(col) for col in OUTPUT_COLUMNS if col not in PREDICTION_COLUMNS}
+    result.update({col: None for col in PREDICTION_COLUMNS if col in OUTPUT_COLUMNS})
+    if 'route' in result:
+        result['route'] = route
+    if 'route_reason' in result:
+        result['route_reason'] = reason
+    if route == ROUTE_SKIP:
+        logger.info(f"Skipping row {idx}: {reason}")
+        return result
+    content = row.get('content', '')
+    if route == ROUTE_EMBED_ONLY:
+        if bedrock_client and 'embedding' in result:
+            try:
+                result['embedding'] = _embed(bedrock_client, content[:EMBED_ONLY_MAX_CHARS])
+                logger.info(f"Generated embedding for row {idx}")
+            except Exception as e:
+                logger.error(f"Error generating embedding for row {idx}: {str(e)}")
+        return result
+    # 1. Generate summary
+    summary = ""
+    if summarizer:
+        try:
+            max_length = 1024
+            truncated_content = content[:max_length] if len(content) > max_length else content
+            summary_result = summarizer(
+                truncated_content,
+                max_length=150,
+                min_length=30,
+                do_sample=False
+            )
+            summary = summary_result[0]["summary_text"] if summary_result else ""
+            if 'summary' in result:
+                result['summary'] = summary
+            logger.info(f"Generated summary for row {idx}")
+        except Exception as e:
+            logger.error(f"Error generating summary for row {idx}: {str(e)}")
+    # 2. Perform sentiment analysis on original content
+    if sentiment_analyzer and ('sentiment' in result or 'sentiment_score' in result):
+        try:
+            max_length = 512
+            truncated_content = content[:max_length] if len(content) > max_length else content
+            sentiment_result = sentiment_analyzer(truncated_content)
+            if sentiment_result:
+                if 'sentiment' in result:
+                    result['sentiment'] = sentiment_result[0]["label"]
+                if 'sentiment_score' in result:
+                    result['sentiment_score'] = sentiment_result[0]["score"]
+                logger.info(f"Generated sentiment for row {idx}")
+        except Exception as e:
+            logger.error(f"Error generating sentiment for row {idx}: {str(e)}")
+    # 3. Generate embeddings from the summary (not the original content)
+    if bedrock_client and summary and 'embedding' in result:
+        try:
+            result['embedding'] = _embed(bedrock_client, summary)
+            logger.info(f"Generated embedding for row {idx}")
+        except Exception as e:
+            logger.error(f"Error generating embedding for row {idx}: {str(e)}")
+    return result
+
+def _predict_rows(routed_rows, model_dict, start_idx=0):
     summarizer = model_dict.get("summarizer")
     sentiment_analyzer = model_dict.get("sentiment_analyzer")
     bedrock_client = model_dict.get("bedrock_client")
-    output_data = copy.deepcopy(input_data)
-    for idx, row in enumerate(output_data):
+    for idx, (row, route, reason) in enumerate(routed_rows, start_idx):
         try:
-            content = row.get('content', '')
-            row['summary'] = None
-            row['sentiment'] = None
-            row['sentiment_score'] = None
-            row['embedding'] = None
-            # Skip processing if content is empty
-            if not isinstance(content, str) or not content.strip():
-                logger.warning(f"Empty content for row {idx}")
-                continue
-            # 1. Generate summary
-            summary = ""
-            if summarizer:
-                try:
-                    max_length = 1024
-                    truncated_content = content[:max_length] if len(content) > max_length else content
-                    summary_result = summarizer(
-                        truncated_content,
-                        max_length=150,
-                        min_length=30,
-                        do_sample=False
-                    )
-                    summary = summary_result[0]["summary_text"] if summary_result else ""
-                    row['summary'] = summary
-                    logger.info(f"Generated summary for row {idx}")
-                except Exception as e:
-                    logger.error(f"Error generating summary for row {idx}: {str(e)}")
-            # 2. Perform sentiment analysis on original content
-            if sentiment_analyzer:
-                try:
-                    max_length = 512
-                    truncated_content = content[:max_length] if len(content) > max_length else content
-                    sentiment_result = sentiment_analyzer(truncated_content)
-                    if sentiment_result:
-                        row['sentiment'] = sentiment_result[0]["label"]
-                        row['sentiment_score'] = sentiment_result[0]["score"]
-                        logger.info(f"Generated sentiment for row {idx}")
-                except Exception as e:
-                    logger.error(f"Error generating sentiment for row {idx}: {str(e)}")
-            # 3. Generate embeddings from the summary (not the original content)
-            if bedrock_client and summary:
-                try:
-                    model_id = "amazon.titan-embed-text-v1"
-                    request_body = json.dumps({
-                        "inputText": summary
-                    })
-                    response = bedrock_client.invoke_model(
-                        modelId=model_id,
-                        contentType="application/json",
-                        accept="application/json",
-                        body=request_body
-                    )
-                    response_body = json.loads(response.get("body").read())
-                    embedding = response_body.get("embedding")
-                    row['embedding'] = embedding
-                    logger.info(f"Generated embedding for row {idx}")
-                except Exception as e:
-                    logger.error(f"Error generating embedding for row {idx}: {str(e)}")
+            result = _predict_row(idx, row, route, reason, summarizer, sentiment_analyzer, bedrock_client)
         except Exception as e:
             logger.error(f"Error processing row {idx}: {str(e)}")
-    return output_data
+            result = {col: row.get(col) for col in OUTPUT_COLUMNS}
+        yield result
+
+def _predict_chunk(chunk):
+    """
+    Run a chunk of rows on the models of the current pool worker.
+    """
+    start_idx, rows = chunk
+    return list(_predict_rows(rows, _worker_models, start_idx))
+
+def _iter_chunks(input_data, chunk_size):
+    rows = iter(input_data)
+    start_idx = 0
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield start_idx, chunk
+        start_idx += len(chunk)
+
+def _pool_results(pool, routed_rows):
+    """
+    Run chunks of rows on the worker pool in input order, with at most
+    INFERENCE_MAX_CHUNKS_IN_FLIGHT chunks submitted and not yet consumed.
+    Pool.imap would read and pickle the whole request up front.
+    """
+    pending = deque()
+    for chunk in _iter_chunks(routed_rows, INFERENCE_CHUNK_SIZE):
+        pending.append(pool.apply_async(_predict_chunk, (chunk,)))
+        if len(pending) >= INFERENCE_MAX_CHUNKS_IN_FLIGHT:
+            yield from pending.popleft().get()
+    while pending:
+        yield from pending.popleft().get()
+
+def _route_rows(input_data, counts):
+    for row in input_data:
+        route, reason = route_row(row)
+        counts[(route, reason)] += 1
+        yield row, route, reason
+
+def _format_route_counts(counts):
+    return ', '.join(f"{route}/{reason}={count}" for (route, reason), count in sorted(counts.items()))
+
+def predict_fn(input_data, model_dict):
+    """
+    Lazily generate predictions for the input rows (any iterable of dicts).
+    Rows are processed one at a time and never copied; each result only
+    carries the OUTPUT_COLUMNS, so 'content' is dropped unless requested.
+    Every row is routed first (see route_row) and route counts are logged
+    per request and in total for the job.
+    In worker-pool mode, chunks of INFERENCE_CHUNK_SIZE rows are spread
+    across the workers and results are yielded in input order.
+    """
+    counts = Counter()
+    routed_rows = _route_rows(input_data, counts)
+    pool = model_dict.get("worker_pool")
+    if pool:
+        results = _pool_results(pool, routed_rows)
+    else:
+        results = _predict_rows(routed_rows, model_dict)
+    count = 0
+    for result in results:
+        count += 1
+        yield result
+    route_totals.update(counts)
+    logger.info(f"Processed {count} records; routes: {_format_route_counts(counts)}")
+    logger.info(f"Job route totals: {_format_route_counts(route_totals)}")
+
+def _output_fieldnames():
+    fieldnames = list(OUTPUT_COLUMNS)
+    if EMBEDDING_ENCODING != 'list' and 'embedding' in fieldnames:
+        fieldnames.insert(fieldnames.index('embedding') + 1, 'embedding_encoding')
+    return fieldnames
+
+def _encode_embedding(embedding):
+    """
+    Encode an embedding as base64 of its little-endian float32/float16 bytes.
+    """
+    if embedding is None:
+        return None
+    dtype = np.dtype(EMBEDDING_DTYPES[EMBEDDING_ENCODING]).newbyteorder('<')
+    return base64.b64encode(np.asarray(embedding, dtype=dtype).tobytes()).decode('ascii')
+
+def _encode_rows(prediction_data):
+    """
+    Apply EMBEDDING_ENCODING to each row as it is serialized.
+    """
+    if EMBEDDING_ENCODING == 'list':
+        yield from prediction_data
+        return
+    encoding = f"base64-{EMBEDDING_ENCODING}"
+    for row in prediction_data:
+        if row.get('embedding') is not None:
+            row['embedding'] = _encode_embedding(row['embedding'])
+            row['embedding_encoding'] = encoding
+        yield row
+
+def _write_csv(prediction_data, output):
+    writer = csv.DictWriter(output, fieldnames=_output_fieldnames(), extrasaction='ignore')
+    rows = _encode_rows(prediction_data)
+    first_row = next(rows, None)
+    if first_row is None:
+        return
+    writer.writeheader()
+    writer.writerow(first_row)
+    for row in rows:
+        writer.writerow(row)
+
+def _write_json(prediction_data, output):
+    output.write('[')
+    for idx, row in enumerate(_encode_rows(prediction_data)):
+        if idx:
+            output.write(', ')
+        output.write(json.dumps(row))
+    output.write(']')
+
+def _write_jsonlines(prediction_data, output):
+    for row in _encode_rows(prediction_data):
+        output.write(json.dumps(row))
+        output.write('\n')
+
+def _write_parquet(prediction_data):
+    """
+    Write the predictions as a Parquet file with the embedding stored as a
+    fixed-size list column. Parquet is columnar, so rows are collected first,
+    with each embedding converted to a compact numpy array as it arrives.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    dtype = EMBEDDING_DTYPES.get(EMBEDDING_ENCODING, np.float32)
+    columns = {col: [] for col in OUTPUT_COLUMNS}
+    for row in prediction_data:
+        for col in OUTPUT_COLUMNS:
+            value = row.get(col)
+            if col == 'embedding' and value is not None:
+                value = np.asarray(value, dtype=dtype)
+            columns[col].append(value)
+    arrays = {}
+    for col, values in columns.items():
+        if col == 'embedding':
+            dim = next((len(v) for v in values if v is not None), DEFAULT_EMBEDDING_DIM)
+            value_type = pa.float16() if dtype == np.float16 else pa.float32()
+            arrays[col] = pa.array(values, type=pa.list_(value_type, dim))
+        elif col == 'sentiment_score':
+            arrays[col] = pa.array(values, type=pa.float64())
+        else:
+            arrays[col] = pa.array(values, type=pa.string())
+    table = pa.table(arrays)
+    table = table.replace_schema_metadata({'embedding_encoding': np.dtype(dtype).name})
+    output = io.BytesIO()
+    pq.write_table(table, output)
+    return output.getvalue()
 
 def output_fn(prediction_data, response_content_type):
     """
-    Format the prediction data (list of dicts) as output
+    Format the prediction data (any iterable of dicts) as output.
+    Rows are serialized as predict_fn yields them, so only the formatted
+    output is held in memory rather than every result dict as well. Input
+    parse errors surface here and are re-raised, so the request fails.
     """
     logger.info(f"Formatting output with content type: {response_content_type}")
+    output = io.StringIO()
     if response_content_type == 'text/csv':
         try:
-            if not prediction_data:
-                return ""
-            output = io.StringIO()
-            writer = csv.DictWriter(output, fieldnames=prediction_data[0].keys())
-            writer.writeheader()
-            writer.writerows(prediction_data)
+            _write_csv(prediction_data, output)
             return output.getvalue()
+        except InputParseError:
+            raise
         except Exception as e:
             logger.error(f"Error converting results to CSV: {str(e)}")
             return "Error converting results to CSV"
     elif response_content_type == 'application/json':
         try:
-            return json.dumps(prediction_data)
+            _write_json(prediction_data, output)
+            return output.getvalue()
+        except InputParseError:
+            raise
         except Exception as e:
             logger.error(f"Error converting results to JSON: {str(e)}")
             return json.dumps({"error": "Error converting results to JSON"})
+    elif response_content_type in JSONLINES_CONTENT_TYPES:
+        try:
+            _write_jsonlines(prediction_data, output)
+            return output.getvalue()
+        except InputParseError:
+            raise
+        except Exception as e:
+            logger.error(f"Error converting results to JSON Lines: {str(e)}")
+            return json.dumps({"error": "Error converting results to JSON Lines"}) + '\n'
+    elif response_content_type in PARQUET_CONTENT_TYPES:
+        try:
+            return _write_parquet(prediction_data)
+        except ImportError:
+            raise ValueError("pyarrow is required for Parquet output")
+        except InputParseError:
+            raise
+        except Exception as e:
+            logger.error(f"Error converting results to Parquet: {str(e)}")
+            return json.dumps({"error": "Error converting results to Parquet"})
     else:
         logger.warning(f"Unsupported content type: {response_content_type}, defaulting to text/csv")
-        if not prediction_data:
-            return ""
-        output = io.StringIO()
-        writer = csv.DictWriter(output, fieldnames=prediction_data[0].keys())
-        writer.writeheader()
-        writer.writerows(prediction_data)
+        _write_csv(prediction_data, output)
         return output.getvalue()